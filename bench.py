@@ -0,0 +1,438 @@
+# Proyect title: Xq Fetch - benchmarks
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import contextlib
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+XQ_FILE = os.path.join(ROOT_DIR, "xq.py")
+BASELINE_FILE = os.path.join(ROOT_DIR, "bench_baseline.json")
+# Tiempo máximo (ms) de una ejecución sin argumentos con la caché creada
+STARTUP_BUDGET_MS = 60.0
+# Porcentaje que un resultado puede empeorar respecto a la referencia
+THRESHOLD = 25.0
+# Diferencias menores (ms) se consideran ruido aunque superen el porcentaje
+NOISE_MS = 0.005
+# Veces que se llama en cada medida a los recolectores que tardan microsegundos
+CHEAP_REPEAT = 100
+# Clientes que piden las métricas a la vez en el benchmark de serve --metrics
+SCRAPE_CLIENTS = 16
+# Módulos que nunca se deben importar al mostrar la información con la caché creada
+FORBIDDEN_IMPORTS = ["cpuinfo", "argparse"]
+CACHED_DATA = {
+    "settings": {
+        "color": "blue",
+        "ram": {"unit": "gb"},
+        "date": {"format_hour": "24", "format_date": "full"},
+    },
+}
+
+
+# Variables de entorno que apuntan los directorios de xq al directorio temporal
+XDG_DIRS = {
+    "XDG_CONFIG_HOME": "config",
+    "XDG_CACHE_HOME": "cache",
+    "XDG_STATE_HOME": "state",
+    "XQ_SHARED_CACHE": "shared",
+}
+
+
+@contextlib.contextmanager
+def work_dir():
+    """
+    Runs the block inside a temporary directory that also holds the xq
+    settings, caches and history.
+    """
+    previous = os.getcwd()
+    environment = dict(os.environ)
+    directory = tempfile.mkdtemp(prefix="xq-bench-")
+    try:
+        for variable, name in XDG_DIRS.items():
+            os.environ[variable] = os.path.join(directory, name)
+        # Como al usarlo normalmente, xq_core se guarda compilado en __pycache__
+        os.environ.pop("PYTHONDONTWRITEBYTECODE", None)
+        os.makedirs(os.path.join(directory, "config", "xq"))
+        with open(
+            os.path.join(directory, "config", "xq", "settings.json"), "w"
+        ) as file:
+            json.dump(CACHED_DATA, file)
+        os.chdir(directory)
+        yield directory
+    finally:
+        os.chdir(previous)
+        os.environ.clear()
+        os.environ.update(environment)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# Contenido fijo de los archivos de /proc y /sys que leen los recolectores de
+# Linux (y de cgroup) con --mock: se mide cómo xq los interpreta
+MOCKED_FILES = {
+    "/proc/meminfo": (
+        "MemTotal:       16384000 kB\n"
+        "MemFree:         4096000 kB\n"
+        "MemAvailable:    8192000 kB\n"
+        "Buffers:          512000 kB\n"
+        "Cached:          3072000 kB\n"
+        "SwapTotal:       2048000 kB\n"
+        "SwapFree:        2048000 kB\n"
+    ),
+    "/proc/cpuinfo": "".join(
+        f"processor\t: {cpu}\nmodel name\t: Benchmark CPU\n"
+        f"physical id\t: 0\ncore id\t\t: {cpu % 4}\n\n"
+        for cpu in range(8)
+    ),
+    "/proc/uptime": "3600.00 28000.00\n",
+    "/proc/loadavg": "0.50 0.40 0.30 1/200 12345\n",
+    "/proc/mounts": (
+        "/dev/sda1 / ext4 rw,relatime 0 0\n"
+        "proc /proc proc rw,nosuid,nodev,noexec,relatime 0 0\n"
+        "tmpfs /run tmpfs rw,nosuid,nodev 0 0\n"
+    ),
+    "/proc/net/dev": (
+        "Inter-|   Receive                            |  Transmit\n"
+        " face |bytes    packets errs drop fifo frame compressed multicast|bytes"
+        "    packets errs drop fifo colls carrier compressed\n"
+        "    lo:    1024      10    0    0    0     0          0         0"
+        "     1024      10    0    0    0     0       0          0\n"
+        "  eth0: 1073741824 1000   0    0    0     0          0         0"
+        "  1048576    1000    0    0    0     0       0          0\n"
+    ),
+    "/sys/class/net/eth0/operstate": "up\n",
+    "/proc/stat": "".join(
+        f"{name} 100 0 50 1000 10 0 0 0 0 0\n"
+        for name in ["cpu"] + [f"cpu{cpu}" for cpu in range(8)]
+    )
+    + "intr 0\n",
+    "/proc/diskstats": "   8       0 sda 100 0 2097152 0 100 0 2048 0 0 0 0\n",
+    "/var/lib/dpkg/status": "".join(
+        f"Package: package{index}\nStatus: install ok installed\n\n"
+        for index in range(1000)
+    ),
+    "/proc/1/stat": "1 (init) S" + " 0" * 16 + " 100" + " 0" * 30 + "\n",
+    "/sys/fs/cgroup/memory.current": "1073741824\n",
+    "/sys/fs/cgroup/memory.stat": "anon 805306368\ninactive_file 268435456\n",
+    "/sys/fs/cgroup/memory.max": "4294967296\n",
+    "/sys/fs/cgroup/cpu.max": "200000 100000\n",
+}
+
+
+@contextlib.contextmanager
+def mocked_probes(xq):
+    """
+    Replaces what the collectors read (the /proc and /sys files, psutil,
+    py-cpuinfo and platform) with fixed values, so only xq's own work is
+    timed.
+    """
+    import platform
+    from types import SimpleNamespace
+    from collections import namedtuple
+
+    import psutil
+    import cpuinfo
+
+    files = {**MOCKED_FILES, f"/proc/{os.getppid()}/comm": "bash\n"}
+    cpu_times = namedtuple("scputimes", "user nice system idle iowait")(
+        100.0, 0.0, 50.0, 1000.0, 10.0
+    )
+    psutil_values = {
+        "virtual_memory": lambda: SimpleNamespace(
+            used=8 * 1024**3, total=16 * 1024**3, percent=50.0
+        ),
+        "swap_memory": lambda: SimpleNamespace(used=0, total=2 * 1024**3),
+        "boot_time": lambda: time.time() - 3600,
+        "disk_partitions": lambda all=False: [SimpleNamespace(mountpoint="/")],
+        "disk_usage": lambda path: SimpleNamespace(
+            used=100 * 1024**3, total=500 * 1024**3
+        ),
+        "net_if_stats": lambda: {"eth0": SimpleNamespace(isup=True)},
+        "net_io_counters": lambda pernic=False: {
+            "eth0": SimpleNamespace(bytes_recv=1024**3, bytes_sent=1024**2)
+        },
+        "cpu_times": lambda percpu=False: [cpu_times] * 8 if percpu else cpu_times,
+        "disk_io_counters": lambda: SimpleNamespace(
+            read_bytes=1024**3, write_bytes=1024**2
+        ),
+        "cpu_count": lambda logical=True: 8 if logical else 4,
+    }
+    platform_values = {
+        "system": lambda: "Linux",
+        "release": lambda: "6.0.0-bench",
+        "version": lambda: "#1 SMP",
+        "architecture": lambda *args, **kwargs: ("64bit", "ELF"),
+    }
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(xq, "read_file", files.get))
+        stack.enter_context(
+            mock.patch.object(xq, "get_cgroup_dir", lambda: "/sys/fs/cgroup")
+        )
+        stack.enter_context(
+            mock.patch.object(
+                cpuinfo, "get_cpu_info", lambda: {"brand_raw": "Benchmark CPU"}
+            )
+        )
+        for name, value in psutil_values.items():
+            stack.enter_context(mock.patch.object(psutil, name, value))
+        for name, value in platform_values.items():
+            stack.enter_context(mock.patch.object(platform, name, value))
+        yield
+
+
+def median_ms(function, runs: int, repeat: int = 1) -> float:
+    """
+    Returns the median time of running the function, in milliseconds. Every
+    run calls it repeat times, for the ones that take a few microseconds.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        times.append((time.perf_counter() - start) * 1000 / repeat)
+    return sorted(times)[len(times) // 2]
+
+
+def parse_importtime(output: str) -> list[str]:
+    """
+    Returns the name of every module imported in a -X importtime output.
+    """
+    return [
+        line.rsplit("|", 1)[1].strip()
+        for line in output.splitlines()
+        if line.startswith("import time:") and "cumulative" not in line
+    ]
+
+
+def check_startup(budget_ms: float = STARTUP_BUDGET_MS, runs: int = 11) -> bool:
+    """
+    Checks that xq.py with the caches created skips the forbidden imports and
+    that the whole run (interpreter, imports, module body and output) fits the
+    budget.
+    """
+    with work_dir():
+        # La primera ejecución crea la caché de hardware (facts.json) y guarda
+        # xq_core compilado
+        subprocess.run([sys.executable, XQ_FILE], capture_output=True)
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", XQ_FILE],
+            capture_output=True,
+            text=True,
+        )
+        names = parse_importtime(result.stderr)
+        forbidden = [name for name in FORBIDDEN_IMPORTS if name in names]
+        if forbidden:
+            print(f"FAIL: startup imported {', '.join(forbidden)}")
+            return False
+
+        elapsed = median_ms(
+            lambda: subprocess.run([sys.executable, XQ_FILE], capture_output=True),
+            runs,
+        )
+
+    status = "OK" if elapsed <= budget_ms else "FAIL"
+    print(f"{status}: startup took {elapsed:.1f} ms (budget {budget_ms:.1f} ms)")
+    return elapsed <= budget_ms
+
+
+def bench_startup(runs: int) -> dict:
+    """
+    Times a whole run of xq.py without cache (cold) and with cache (warm).
+    """
+
+    def run():
+        subprocess.run([sys.executable, XQ_FILE], capture_output=True, check=True)
+
+    def cold():
+        facts_file = os.path.join("cache", "xq", "facts.json")
+        if os.path.exists(facts_file):
+            os.remove(facts_file)
+        run()
+
+    with work_dir():
+        return {
+            "startup.cold": median_ms(cold, max(1, runs // 4)),
+            "startup.warm": median_ms(run, runs),
+        }
+
+
+def bench_collectors(runs: int, mocked: bool) -> dict:
+    """
+    Times every collector and the render on their own, in this process.
+    """
+
+    def cpu_cold():
+        if os.path.exists(xq.FACTS_FILE):
+            os.remove(xq.FACTS_FILE)
+        xq.load_facts()
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(work_dir())
+        # Se importa aquí para que use los directorios temporales
+        sys.path.insert(0, ROOT_DIR)
+        import xq_core as xq
+
+        if mocked:
+            stack.enter_context(mocked_probes(xq))
+        data = xq.load_data()
+        # Con py-cpuinfo real cada medida en frío tarda alrededor de un segundo
+        cold_runs = runs if mocked else max(1, runs // 10)
+        results = {
+            "collector.cpu.cold": median_ms(cpu_cold, cold_runs),
+            "collector.cpu.warm": median_ms(xq.load_facts, runs, CHEAP_REPEAT),
+            "collector.ram": median_ms(xq.BACKEND["ram"], runs, CHEAP_REPEAT),
+            "collector.uptime": median_ms(xq.BACKEND["uptime"], runs, CHEAP_REPEAT),
+            "collector.calendar": median_ms(xq.get_calendar_info, runs, CHEAP_REPEAT),
+            "collector.os": median_ms(xq.get_os_info, runs, CHEAP_REPEAT),
+            "collect_snapshot": median_ms(lambda: xq.collect_snapshot(data), runs),
+        }
+        snapshot = xq.collect_snapshot(data)
+        results["render.fetch_info"] = median_ms(
+            lambda: xq.fetch_info(snapshot, data["settings"]), runs, CHEAP_REPEAT
+        )
+    return results
+
+
+def bench_scrape(runs: int, clients: int = SCRAPE_CLIENTS) -> dict:
+    """
+    Times the requests to "xq serve --metrics" from a local client, one at a
+    time and from many clients at once.
+    """
+    import threading
+    import http.client
+    from concurrent.futures import ThreadPoolExecutor
+
+    connections = threading.local()
+
+    def scrape():
+        # Cada hilo mantiene su conexión abierta, como Prometheus
+        if not hasattr(connections, "client"):
+            connections.client = http.client.HTTPConnection(host, port, timeout=5)
+        connections.client.request("GET", "/metrics")
+        response = connections.client.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"scrape failed with status {response.status}")
+
+    with work_dir():
+        server = subprocess.Popen(
+            [sys.executable, XQ_FILE, "serve", "--metrics", "--listen", "127.0.0.1:0"],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            # "Serving metrics on http://127.0.0.1:<port>/metrics."
+            address = server.stdout.readline().split("//")[-1].split("/")[0]
+            host, _, port = address.rpartition(":")
+            if not port.isdigit():
+                raise RuntimeError("xq serve --metrics did not start")
+            port = int(port)
+
+            with ThreadPoolExecutor(max_workers=clients) as pool:
+                return {
+                    "scrape.single": median_ms(scrape, runs),
+                    # Lo que tardan a la vez una petición de cada cliente
+                    f"scrape.concurrent{clients}": median_ms(
+                        lambda: list(pool.map(lambda _: scrape(), range(clients))),
+                        runs,
+                    ),
+                }
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Prints every result against the baseline and returns False on a regression.
+    """
+    ok = True
+    for name, value in results.items():
+        line = f"{name:<24} {value:11.4f} ms"
+        if baseline.get(name):
+            change = (value - baseline[name]) / baseline[name] * 100
+            line += f"  ({change:+.1f}% vs {baseline[name]:.4f} ms)"
+            if change > threshold and value - baseline[name] > NOISE_MS:
+                line += "  REGRESSION"
+                ok = False
+        print(line)
+    return ok
+
+
+def main() -> bool:
+    """
+    Runs the benchmarks and returns False if any check failed.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Xq Fetch benchmarks")
+    parser.add_argument(
+        "suite",
+        help="What to run (default all)",
+        choices=["imports", "startup", "collectors", "scrape", "all"],
+        nargs="?",
+        default="all",
+    )
+    parser.add_argument(
+        "--budget",
+        help=f"Warm startup budget in ms (default {STARTUP_BUDGET_MS})",
+        default=STARTUP_BUDGET_MS,
+        type=float,
+    )
+    parser.add_argument("--runs", help="Runs per measure", default=20, type=int)
+    parser.add_argument(
+        "--mock",
+        help="Give the collectors fixed /proc files, psutil and py-cpuinfo values",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--baseline",
+        help=f"Baseline JSON file (default {BASELINE_FILE})",
+        default=BASELINE_FILE,
+    )
+    parser.add_argument(
+        "--save", help="Save the results as the new baseline", action="store_true"
+    )
+    parser.add_argument(
+        "--threshold",
+        help=f"Allowed regression in percent (default {THRESHOLD})",
+        default=THRESHOLD,
+        type=float,
+    )
+    args = parser.parse_args()
+
+    ok = True
+    if args.suite in ["imports", "all"]:
+        ok = check_startup(args.budget) and ok
+
+    results = {}
+    if args.suite in ["startup", "all"]:
+        results.update(bench_startup(args.runs))
+    if args.suite in ["collectors", "all"]:
+        results.update(bench_collectors(args.runs, args.mock))
+    if args.suite in ["scrape", "all"]:
+        results.update(bench_scrape(args.runs))
+    if not results:
+        return ok
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+    ok = compare(results, baseline, args.threshold) and ok
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
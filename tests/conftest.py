@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """
+    Keeps the settings, caches and history in a temporary directory and
+    returns it.
+    """
+    for name in [
+        "SYSTEM_DATA_FILE",
+        "DATA_FILE",
+        "SHARED_FACTS_FILE",
+        "FACTS_FILE",
+        "CACHE_FILE",
+        "HISTORY_FILE",
+    ]:
+        monkeypatch.setattr(xq, name, str(tmp_path / name.lower()))
+    return tmp_path
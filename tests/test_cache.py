@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+def rewrite(path: str, data: dict, in_place: bool, mtime_ns: int):
+    """
+    Writes the JSON in the same file (same inode) or in a new one renamed over
+    it (new inode), and sets its modification time.
+    """
+    if in_place:
+        with open(path, "r+") as file:
+            file.truncate(0)
+            file.write(json.dumps(data))
+    else:
+        with open(path + ".new", "w") as file:
+            file.write(json.dumps(data))
+        os.replace(path + ".new", path)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_stale_binary_copy_is_rejected(files):
+    path = str(files / "data.json")
+    xq.write_json_atomic(path, {"value": "aaaa"})
+    stat = os.stat(path)
+    assert xq.read_binary_cache(path, stat) == {"value": "aaaa"}
+
+    # Solo cambia la fecha de modificación
+    rewrite(path, {"value": "bbbb"}, True, stat.st_mtime_ns + 1000)
+    changed = os.stat(path)
+    assert (changed.st_size, changed.st_ino) == (stat.st_size, stat.st_ino)
+    assert xq.read_binary_cache(path, changed) is None
+    assert xq.read_json(path) == {"value": "bbbb"}
+
+    # Solo cambia el tamaño
+    stat = os.stat(path)
+    rewrite(path, {"value": "ccccc"}, True, stat.st_mtime_ns)
+    changed = os.stat(path)
+    assert (changed.st_mtime_ns, changed.st_ino) == (stat.st_mtime_ns, stat.st_ino)
+    assert xq.read_binary_cache(path, changed) is None
+    assert xq.read_json(path) == {"value": "ccccc"}
+
+    # Solo cambia el inodo (otro archivo con la misma fecha y el mismo tamaño)
+    stat = os.stat(path)
+    rewrite(path, {"value": "ddddd"}, False, stat.st_mtime_ns)
+    changed = os.stat(path)
+    assert (changed.st_mtime_ns, changed.st_size) == (stat.st_mtime_ns, stat.st_size)
+    assert changed.st_ino != stat.st_ino
+    assert xq.read_binary_cache(path, changed) is None
+    assert xq.read_json(path) == {"value": "ddddd"}
+
+    # read_json vuelve a crear la copia a partir del JSON actual
+    assert xq.read_binary_cache(path, changed) == {"value": "ddddd"}
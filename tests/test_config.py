@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+def count_writes(monkeypatch) -> list:
+    """
+    Returns the list of paths written with write_json_atomic, updated as they
+    are written.
+    """
+    writes = []
+    write = xq.write_json_atomic
+
+    def wrapper(path, *args, **kwargs):
+        writes.append(path)
+        return write(path, *args, **kwargs)
+
+    monkeypatch.setattr(xq, "write_json_atomic", wrapper)
+    return writes
+
+
+def test_config_set_is_all_or_nothing(files, monkeypatch):
+    writes = count_writes(monkeypatch)
+    data = xq.load_data()
+
+    # Con un valor no válido no se cambia ninguno
+    assert not xq.run_config("set", ["color=red", "ram.unit=tb"], data)
+    assert not xq.run_config("set", ["color=red", "unknown=1"], data)
+    assert not xq.run_config("set", ["color"], data)
+    assert writes == []
+    assert xq.load_data()["settings"]["color"] == "blue"
+
+    # Todos los válidos se guardan con una sola escritura
+    assert xq.run_config(
+        "set", ["color=red", "ram.unit=mb", "fields=os,cpu", "cache.disks.ttl=5"], data
+    )
+    assert writes == [xq.DATA_FILE]
+    settings = xq.load_data()["settings"]
+    assert settings["color"] == "red"
+    assert settings["ram"]["unit"] == "mb"
+    assert settings["fields"] == ["os", "cpu"]
+    assert settings["cache"]["disks"] == {"ttl": 5.0, "policy": "ttl"}
+
+
+def test_config_import_replaces_the_settings(files, monkeypatch):
+    data = xq.load_data()
+    assert xq.run_config("set", ["color=red", "fields=os,cpu"], data)
+
+    document = files / "import.json"
+    document.write_text(json.dumps({"settings": {"ram": {"unit": "mb"}}}))
+    assert xq.run_config("import", [str(document)], data)
+
+    # Lo que no está en el documento vuelve a los valores por defecto
+    settings = xq.load_data()["settings"]
+    defaults = xq.validate_data({})["settings"]
+    assert settings == {**defaults, "ram": {"unit": "mb"}}
+
+    # Un documento con un valor no válido no cambia nada
+    writes = count_writes(monkeypatch)
+    document.write_text(json.dumps({"color": "red", "date": {"format_hour": "7"}}))
+    assert not xq.run_config("import", [str(document)], data)
+    assert writes == []
+    assert xq.load_data()["settings"] == settings
+
+
+def test_unchanged_settings_are_not_written(files, monkeypatch):
+    writes = count_writes(monkeypatch)
+
+    assert xq.save_data(xq.load_data())
+    assert xq.apply_settings([("color", "blue")]) == []
+    assert writes == []
+    assert not os.path.exists(xq.DATA_FILE)
+
+    assert xq.apply_settings([("color", "red")]) == []
+    assert xq.apply_settings([("color", "red")]) == []
+    assert xq.save_data(xq.load_data())
+    assert writes == [xq.DATA_FILE]
+
+
+def test_concurrent_changes_are_kept(files):
+    import threading
+
+    # Los ajustes leídos antes de que otro proceso los cambie no los pisan
+    stale = xq.load_data()
+    assert xq.apply_settings([("ram.unit", "mb")]) == []
+    assert xq.apply_settings([("color", "red")]) == []
+    assert stale["settings"]["ram"]["unit"] == "gb"
+    settings = xq.load_data()["settings"]
+    assert (settings["color"], settings["ram"]["unit"]) == ("red", "mb")
+
+    # Cada hilo cambia un ajuste distinto a la vez y no se pierde ninguno
+    names = [name for name in xq.COLLECTORS if name not in xq.UNCACHED]
+    threads = [
+        threading.Thread(
+            target=xq.apply_settings, args=([(f"cache.{name}.ttl", index + 1)],)
+        )
+        for index, name in enumerate(names)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cache = xq.load_data()["settings"]["cache"]
+    assert {name: cache[name]["ttl"] for name in names} == {
+        name: index + 1 for index, name in enumerate(names)
+    }
+
+
+def test_legacy_data_file_is_imported_once(files, monkeypatch, capsys):
+    monkeypatch.chdir(files)
+    legacy = {"settings": {"color": "red", "ram": {"unit": "MB"}}, "cpu_info": "x"}
+    (files / xq.LEGACY_DATA_FILE).write_text(json.dumps(legacy))
+
+    settings = xq.load_data()["settings"]
+    assert (settings["color"], settings["ram"]["unit"]) == ("red", "mb")
+    assert "Imported the settings" in capsys.readouterr().err
+    assert xq.read_json(xq.DATA_FILE) == {
+        "settings": {"color": "red", "ram": {"unit": "mb"}}
+    }
+
+    # Una vez importado, el archivo antiguo ya no se lee
+    (files / xq.LEGACY_DATA_FILE).write_text(
+        json.dumps({"settings": {"color": "cyan"}})
+    )
+    assert xq.load_data()["settings"]["color"] == "red"
+    assert capsys.readouterr().err == ""
@@ -0,0 +1,27 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+def test_export_input_skips_failed_batch_reports(tmp_path, capsys):
+    lines = [
+        {"target": "local", "ok": True, "values": {"machine": "host", "os": "Linux"}},
+        {"target": "cmd:ssh web1 xq", "ok": False, "error": "timed out"},
+        {"machine": "web2", "os": "Linux"},
+    ]
+    path = tmp_path / "snapshots.ndjson"
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n\nnot json\n")
+
+    exported = list(xq.read_export_input(str(path)))
+
+    assert exported == [
+        ("00001-local", {"machine": "host", "os": "Linux"}),
+        ("00003-web2", {"machine": "web2", "os": "Linux"}),
+    ]
+    errors = capsys.readouterr().err
+    assert "Skipping line 2: cmd:ssh web1 xq failed: timed out" in errors
+    assert "Skipping line 5" in errors
@@ -0,0 +1,88 @@
+import os
+import sys
+import struct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+def write_records(path: str, times):
+    """
+    Writes one history record for every time, with the time as uptime.
+    """
+    with open(path, "wb") as file:
+        for timestamp in times:
+            file.write(struct.pack(xq.HISTORY_RECORD, timestamp, timestamp, 1, 2))
+
+
+def snapshot(uptime: float) -> xq.SystemSnapshot:
+    """
+    Returns a snapshot with only the values saved in the history.
+    """
+    return xq.snapshot_from_dict(
+        {"uptime_seconds": uptime, "ram_used_bytes": 1, "ram_total_bytes": 2}
+    )
+
+
+def test_read_history_searches_across_rotated_files(files):
+    # Del más viejo (.2) al más nuevo, como quedan al rotar
+    write_records(xq.HISTORY_FILE + ".2", range(0, 100))
+    write_records(xq.HISTORY_FILE + ".1", range(100, 200))
+    write_records(xq.HISTORY_FILE, range(200, 300))
+
+    def times(since, until):
+        return [values[0] for values in xq.read_history(since, until)]
+
+    assert times(150, 250) == list(range(150, 251))
+    assert times(99.5, 100.5) == [100]
+    assert times(-10, 2) == [0, 1, 2]
+    assert times(299, 1000) == [299]
+    assert times(300, 1000) == []
+    assert times(0, 299) == list(range(300))
+
+
+def test_history_rotates_and_drops_old_files(files, monkeypatch):
+    size = struct.calcsize(xq.HISTORY_RECORD)
+    monkeypatch.setattr(xq, "HISTORY_INTERVAL", 0)
+    monkeypatch.setattr(xq, "HISTORY_MAX_BYTES", 4 * size)
+    monkeypatch.setattr(xq, "HISTORY_FILES", 2)
+
+    # Se rota al pasar de 4 registros: 4 rotaciones de 5 y 2 en el actual
+    for uptime in range(22):
+        xq.append_history(snapshot(uptime))
+
+    # Solo se conservan HISTORY_FILES archivos rotados
+    assert xq.history_files() == [
+        xq.HISTORY_FILE + ".2",
+        xq.HISTORY_FILE + ".1",
+        xq.HISTORY_FILE,
+    ]
+    assert [os.path.getsize(path) // size for path in xq.history_files()] == [5, 5, 2]
+    uptimes = [values[1] for values in xq.read_history(0, float("inf"))]
+    assert uptimes == list(range(10, 22))
+
+    # Al rotar otra vez .1 pasa a .2 y se borra por ser más viejo que
+    # HISTORY_RETENTION
+    old = os.path.getmtime(xq.HISTORY_FILE + ".1") - xq.HISTORY_RETENTION - 1
+    os.utime(xq.HISTORY_FILE + ".1", (old, old))
+    for uptime in range(22, 25):
+        xq.append_history(snapshot(uptime))
+
+    assert xq.history_files() == [xq.HISTORY_FILE + ".1"]
+    uptimes = [values[1] for values in xq.read_history(0, float("inf"))]
+    assert uptimes == list(range(20, 25))
+
+
+def test_append_history_drops_a_partial_record(files, monkeypatch):
+    size = struct.calcsize(xq.HISTORY_RECORD)
+    monkeypatch.setattr(xq, "HISTORY_INTERVAL", 0)
+    write_records(xq.HISTORY_FILE, [1.0])
+    # Un registro a medias, como al apagar el equipo mientras se escribía
+    with open(xq.HISTORY_FILE, "ab") as file:
+        file.write(b"\x01" * (size // 2))
+
+    xq.append_history(snapshot(42))
+
+    assert os.path.getsize(xq.HISTORY_FILE) == 2 * size
+    assert [values[1] for values in xq.read_history(0, float("inf"))] == [1.0, 42]
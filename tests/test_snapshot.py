@@ -0,0 +1,150 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xq_core as xq  # noqa: E402
+
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """
+    Keeps the settings and caches in a temporary directory and returns the
+    counter of calls.
+    """
+    for name in [
+        "SYSTEM_DATA_FILE",
+        "DATA_FILE",
+        "SHARED_FACTS_FILE",
+        "FACTS_FILE",
+        "CACHE_FILE",
+        "HISTORY_FILE",
+    ]:
+        monkeypatch.setattr(xq, name, str(tmp_path / name.lower()))
+    return Counter()
+
+
+def counting(calls: Counter, name: str, function):
+    """
+    Returns function counting its calls in calls[name]. The collectors run
+    in threads, so the counter is updated under a lock.
+    """
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        with lock:
+            calls[name] += 1
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def render() -> str:
+    """
+    Collects every value with the default settings and renders the banner.
+    """
+    data = xq.validate_data({})
+    snapshot = xq.collect_snapshot(data, everything=True)
+    return xq.fetch_info(snapshot, data["settings"])
+
+
+def test_every_collector_runs_once_per_render(calls, monkeypatch):
+    for name, collector in xq.COLLECTORS.items():
+        monkeypatch.setitem(
+            xq.COLLECTORS,
+            name,
+            collector._replace(function=counting(calls, name, collector.function)),
+        )
+    # Lo que se obtiene para la caché de hardware (vacía)
+    for name in ["cpu", "gpu"]:
+        if name in xq.BACKEND:
+            monkeypatch.setitem(
+                xq.BACKEND, name, counting(calls, f"facts.{name}", xq.BACKEND[name])
+            )
+    monkeypatch.setattr(xq, "get_os_info", counting(calls, "facts.os", xq.get_os_info))
+    # La RAM y la swap salen de la misma lectura de /proc/meminfo
+    monkeypatch.setattr(
+        xq, "read_meminfo", counting(calls, "read_meminfo", xq.read_meminfo)
+    )
+
+    render()
+
+    assert set(xq.COLLECTORS) <= set(calls)
+    assert {name: count for name, count in calls.items() if count != 1} == {}
+
+
+def test_psutil_and_platform_calls_run_once_per_render(calls, monkeypatch):
+    import platform
+
+    import psutil
+
+    # El backend genérico es el que usa psutil
+    generic = xq.BACKENDS["generic"]
+    monkeypatch.setattr(xq, "BACKEND", generic)
+    for name, collector in xq.COLLECTORS.items():
+        if name in generic:
+            monkeypatch.setitem(
+                xq.COLLECTORS, name, collector._replace(function=generic[name])
+            )
+    monkeypatch.setitem(
+        generic, "cpu", lambda: ("Test CPU", psutil.cpu_count(logical=False), 8)
+    )
+    for name in [
+        "virtual_memory",
+        "swap_memory",
+        "boot_time",
+        "disk_partitions",
+        "net_if_stats",
+        "net_io_counters",
+        "cpu_count",
+    ]:
+        monkeypatch.setattr(psutil, name, counting(calls, name, getattr(psutil, name)))
+    # platform.node() no se cuenta: también forma parte de la clave de la caché
+    # de hardware, que se comprueba en cada ejecución
+    for name in ["system", "release", "version", "architecture"]:
+        monkeypatch.setattr(
+            platform, name, counting(calls, name, getattr(platform, name))
+        )
+
+    # Sin caché también se obtiene la información de hardware, sin leer otra vez
+    # la memoria
+    render()
+    assert {name: count for name, count in calls.items() if count != 1} == {}
+
+    # Con la caché de hardware creada los valores de hardware no se vuelven a
+    # obtener y el resto una sola vez
+    calls.clear()
+    render()
+    assert set(calls) == {
+        "virtual_memory",
+        "swap_memory",
+        "boot_time",
+        "disk_partitions",
+        "net_if_stats",
+        "net_io_counters",
+    }
+    assert {name: count for name, count in calls.items() if count != 1} == {}
+
+
+def test_sampled_snapshot_reads_every_collector_once(calls, monkeypatch):
+    collectors = {**xq.COLLECTORS, **xq.METRICS_COLLECTORS}
+    for name, collector in collectors.items():
+        wrapped = collector._replace(function=counting(calls, name, collector.function))
+        for table in [xq.COLLECTORS, xq.METRICS_COLLECTORS]:
+            if name in table:
+                monkeypatch.setitem(table, name, wrapped)
+
+    # Como en cada vuelta del daemon: la segunda muestra ya tiene métricas
+    sampler = xq.create_sampler()
+    data = xq.validate_data({})
+    xq.collect_snapshot(data, sampler=sampler)
+    calls.clear()
+    snapshot = xq.collect_snapshot(data, sampler=sampler)
+
+    assert calls["ram"] == calls["network"] == calls["cpu_times"] == 1
+    assert snapshot.metrics["ram"][-1] == snapshot.ram_percent
+    assert snapshot.extra is None
@@ -0,0 +1,3937 @@
+# Proyect title: Xq Fetch - recolección, dibujo y línea de comandos (xq.py la lanza)
+import os
+import sys
+import datetime
+import time
+import functools
+import contextlib
+from typing import Any, Callable, NamedTuple, Optional
+
+# API para usar xq como librería (import xq o import xq_core)
+__all__ = [
+    "collect",
+    "render",
+    "format_snapshot",
+    "snapshot_to_dict",
+    "SystemSnapshot",
+    "Collector",
+    "COLORS",
+    "main",
+]
+
+# Momento en que terminan las importaciones del módulo (para --timings)
+START_TIME = time.perf_counter()
+
+# psutil, cpuinfo, colorama, platform, json y argparse se importan dentro de las funciones que los
+# usan: el script se ejecuta al abrir cada terminal y esas importaciones son lo
+# más lento del arranque (cpuinfo no se importa si la CPU ya está guardada)
+
+# Directorios de cada usuario según XDG (en Windows, %APPDATA% y %LOCALAPPDATA%):
+# ajustes, cachés e historial, sin importar el directorio desde el que se ejecute
+CONFIG_DIR = os.path.join(
+    os.getenv("XDG_CONFIG_HOME")
+    or os.getenv("APPDATA")
+    or os.path.expanduser("~/.config"),
+    "xq",
+)
+CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME")
+    or os.getenv("LOCALAPPDATA")
+    or os.path.expanduser("~/.cache"),
+    "xq",
+)
+STATE_DIR = os.path.join(
+    os.getenv("XDG_STATE_HOME")
+    or os.getenv("LOCALAPPDATA")
+    or os.path.expanduser("~/.local/state"),
+    "xq",
+)
+# Ajustes: los del equipo (opcionales, los pone el administrador) y encima los
+# del usuario, que solo guarda lo que cambia respecto a ellos
+SYSTEM_DATA_FILE = "/etc/xq/settings.json"
+DATA_FILE = os.path.join(CONFIG_DIR, "settings.json")
+# Las versiones anteriores guardaban los ajustes en el directorio de trabajo: se
+# importan una vez si el usuario todavía no tiene los suyos
+LEGACY_DATA_FILE = "data.json"
+# Caché de datos del hardware que casi nunca cambian (se invalida al reiniciar).
+# La del equipo la crea root con --update-facts y la leen todos los usuarios;
+# si no está al día cada usuario usa la suya
+SHARED_FACTS_FILE = os.path.join(
+    os.getenv("XQ_SHARED_CACHE") or "/var/cache/xq", "facts.json"
+)
+FACTS_FILE = os.path.join(CACHE_DIR, "facts.json")
+FACTS_VERSION = 2
+# Copia binaria (marshal) de cada archivo JSON para leerla sin el módulo json
+# (importar json y re cuesta más que leer los datos).
+# Cabecera: marca, versión de marshal, mtime (ns), tamaño e inodo del JSON de
+# origen. Cada escritura atómica crea un inodo nuevo, así que una copia hecha
+# de un JSON anterior no coincide aunque el mtime y el tamaño sean los mismos
+BINARY_SUFFIX = ".cache"
+BINARY_MAGIC = b"XQC2"
+BINARY_HEADER = "<4sHqqQ"
+# Raíz de cgroup v2, para los límites de memoria y CPU dentro de un contenedor
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Valores de los recolectores con caché: nombre -> hora, caducidad, id del
+# arranque y valor. Políticas: "ttl" caduca a los ttl segundos, "boot" también
+# al reiniciar
+CACHE_FILE = os.path.join(CACHE_DIR, "cache.json")
+CACHE_POLICIES = ["ttl", "boot"]
+# Grupo de entry points de los plugins: el nombre es el del campo y el objeto un
+# Collector, un diccionario con sus claves o solo la función
+PLUGIN_GROUP = "xq.collectors"
+VERSION = "v0.1"
+# Historial de uptime y RAM: registros de tamaño fijo (hora, uptime, RAM usada y
+# RAM total, NaN si faltan) que se añaden al final del archivo. Como mucho uno
+# cada HISTORY_INTERVAL segundos; al superar HISTORY_MAX_BYTES se rota a
+# history.bin.1, .2... y se borran los que pasan de HISTORY_FILES o de
+# HISTORY_RETENTION segundos
+HISTORY_FILE = os.path.join(STATE_DIR, "history.bin")
+HISTORY_RECORD = "<dddd"
+HISTORY_INTERVAL = 10.0
+HISTORY_MAX_BYTES = 1024 * 1024
+HISTORY_FILES = 8
+HISTORY_RETENTION = 30 * 24 * 3600
+HISTORY_FIELDS = ["ram", "uptime"]
+# Métricas de los modos --watch y --daemon: muestras que se guardan de cada
+# serie y cuántas se dibujan en las gráficas del dibujo
+METRICS_SIZE = 60
+SPARKLINE_WIDTH = 10
+# Texto que se muestra en lugar de un valor que no se pudo obtener a tiempo
+PLACEHOLDER = "n/a"
+# Modo daemon: cada cuántos segundos se actualiza la información y a partir de
+# cuántos segundos sin actualizar se considera que el daemon está colgado
+DAEMON_INTERVAL = 2.0
+DAEMON_STALE = 3 * DAEMON_INTERVAL
+# El shell depende de quién ejecuta xq: el daemon deja este hueco en el banner y
+# cada cliente pone el suyo
+DAEMON_SHELL = "\0shell\0"
+# Modo serve --metrics: dirección HTTP por defecto y cada cuántos segundos se
+# vuelven a obtener los valores (las peticiones nunca esperan a obtenerlos)
+SERVE_ADDRESS = "127.0.0.1:9877"
+SERVE_INTERVAL = 15.0
+# Medición de tiempos (--timings / XQ_TRACE): None cuando está desactivada
+TRACE = None
+TRACE_FORMATS = ["text", "json", "chrome"]
+TRACE_FILE = "xq-trace.json"
+# Funciones que se miden con --timings, además de cada recolector
+TRACED_FUNCTIONS = [
+    "load_data",
+    "save_data",
+    "load_facts",
+    "collect_facts",
+    "get_cpu_info",
+    "run_collectors",
+    "collect_snapshot",
+    "append_history",
+    "fetch_data",
+    "fetch_info",
+    "format_snapshot",
+]
+# Campos del dibujo: (nombre, etiqueta, separador)
+FIELDS = [
+    ("os", "OS", ": \t"),
+    ("uptime", "Uptime", ":\t"),
+    ("packages", "Packages", ":\t"),
+    ("shell", "Shell", ":\t"),
+    ("cpu", "CPU", ":\t"),
+    ("gpu", "GPU", ":\t"),
+    ("ram", "RAM", ":\t"),
+    ("disk", "Disk", ":\t"),
+    ("date", "Date", ":\t"),
+    ("version", "XQ", ":\t "),
+    ("load", "Load", ":\t"),
+    ("network", "Net", ":\t"),
+]
+# Recolectores que necesita cada campo ("facts" es la caché de hardware)
+FIELD_COLLECTORS = {
+    "os": ["facts"],
+    "uptime": ["uptime"],
+    "packages": ["packages"],
+    "shell": ["shell"],
+    "cpu": ["facts", "cpu_limit"],
+    "gpu": ["facts"],
+    "ram": ["ram"],
+    "disk": ["disks"],
+    "date": ["date"],
+    "version": [],
+    "load": ["load"],
+    "network": ["network"],
+}
+COLORS = ["black", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
+DEFAULT_SETTINGS = {
+    "color": "blue",
+    "ram": {"unit": "gb"},
+    "date": {"format_hour": "24", "format_date": "full"},
+    "fields": [name for name, _, _ in FIELDS],
+    # El nombre del equipo y el usuario casi nunca cambian, y el número de
+    # paquetes solo al instalar o desinstalar
+    "cache": {
+        "user": {"ttl": 24 * 3600, "policy": "boot"},
+        "packages": {"ttl": 600, "policy": "ttl"},
+    },
+}
+# Funciones para obtener información del sistema
+
+
+class SystemSnapshot(NamedTuple):
+    """
+    Immutable record with every value collected for one render.
+    """
+
+    # Los valores de los recolectores que fallan o tardan demasiado son None
+    machine: Optional[str]
+    user: Optional[str]
+    os: Optional[str]
+    uptime: Optional[float]  # seconds
+    cpu: Optional[str]
+    ram_used: Optional[int]
+    ram_total: Optional[int]
+    ram_percent: Optional[float]
+    date: Optional[datetime.datetime]
+    version: str
+    # Solo se miden en los modos --watch y --daemon (hacen falta dos muestras)
+    cpu_percent: Optional[float] = None
+    metrics: Optional[dict] = None  # name -> last samples, oldest first
+    swap_used: Optional[int] = None
+    swap_total: Optional[int] = None
+    load_average: Optional[tuple] = None  # (1, 5, 15 minutes)
+    disks: Optional[tuple] = None  # ((mount, used bytes, total bytes), ...)
+    gpu: Optional[str] = None
+    shell: Optional[str] = None
+    terminal: Optional[str] = None
+    packages: Optional[tuple] = None  # ((manager, count), ...)
+    network: Optional[tuple] = None  # ((name, up, rx bytes, tx bytes), ...)
+    cpu_limit: Optional[float] = None  # CPUs del contenedor (cpu.max)
+    extra: Optional[dict] = None  # Valores de los plugins
+
+
+# Nombres de los fabricantes de GPU según su id PCI
+GPU_VENDORS = {"8086": "Intel", "10de": "NVIDIA", "1002": "AMD", "1af4": "Virtio"}
+
+
+def get_user_info() -> tuple[Optional[str], Optional[str]]:
+    """
+    Returns the machine name and the user name.
+    """
+    import platform
+
+    machine = os.getenv("COMPUTERNAME") or platform.node()
+    user = os.getenv("USERNAME") or os.getenv("USER")
+    return (machine.lower() if machine else None), user
+
+
+def get_cpu_info() -> tuple[str, int, int]:
+    """
+    Returns the CPU brand and its physical and logical cores. (Slow, use the
+    facts cache)
+    """
+    import psutil
+    from cpuinfo import get_cpu_info as cpuinfo
+
+    return (
+        cpuinfo()["brand_raw"],
+        psutil.cpu_count(logical=False),
+        psutil.cpu_count(logical=True),
+    )
+
+
+def get_os_info() -> str:
+    """
+    Returns a string with OS information.
+    """
+    import platform
+
+    return (
+        platform.system()
+        + " "
+        + platform.release()
+        + f" ({platform.version()})"
+        + " "
+        + "x"
+        + platform.architecture()[0]
+    )
+
+
+def get_uptime_info() -> float:
+    """
+    Returns the system uptime in seconds.
+    """
+    import psutil
+
+    return time.time() - psutil.boot_time()
+
+
+def get_calendar_info() -> datetime.datetime:
+    """
+    Returns the current date and time.
+    """
+    return datetime.datetime.now()
+
+
+def get_ram_info() -> tuple[int, int, float, int, int]:
+    """
+    Returns the used RAM, total RAM (bytes), the percent used and the used and
+    total swap (bytes).
+    """
+    import psutil
+
+    memory = psutil.virtual_memory()  # Una sola lectura para que los valores cuadren
+    swap = psutil.swap_memory()
+    return memory.used, memory.total, memory.percent, swap.used, swap.total
+
+
+def get_load_info():
+    """
+    Returns the 1, 5 and 15 minutes load average, or None on Windows.
+    """
+    if hasattr(os, "getloadavg"):
+        return os.getloadavg()
+    return None
+
+
+def get_disk_info() -> tuple:
+    """
+    Returns (mount, used bytes, total bytes) of every disk partition.
+    """
+    import psutil
+
+    disks = []
+    for partition in psutil.disk_partitions(all=False):
+        try:
+            usage = psutil.disk_usage(partition.mountpoint)
+        except OSError:
+            continue
+        disks.append((partition.mountpoint, usage.used, usage.total))
+    return tuple(disks)
+
+
+def get_shell_info() -> Optional[str]:
+    """
+    Returns the name of the user's shell.
+    """
+    shell = os.getenv("SHELL") or os.getenv("COMSPEC")
+    return os.path.basename(shell) if shell else None
+
+
+def get_terminal_info() -> Optional[str]:
+    """
+    Returns the name of the terminal.
+    """
+    if os.getenv("WT_SESSION"):
+        return "Windows Terminal"
+    return os.getenv("TERM_PROGRAM") or os.getenv("TERM")
+
+
+def get_network_info() -> tuple:
+    """
+    Returns (name, up, rx bytes, tx bytes) of every network interface.
+    """
+    import psutil
+
+    stats = psutil.net_if_stats()
+    counters = psutil.net_io_counters(pernic=True)
+    return tuple(
+        (name, stats[name].isup, counter.bytes_recv, counter.bytes_sent)
+        for name, counter in counters.items()
+        if name in stats and not name.startswith("lo")
+    )
+
+
+def get_cpu_times() -> list:
+    """
+    Returns (busy, total) CPU seconds of the whole CPU and then of every core.
+    """
+    import psutil
+
+    times = [psutil.cpu_times()] + psutil.cpu_times(percpu=True)
+    return [
+        (sum(cpu) - cpu.idle - getattr(cpu, "iowait", 0), sum(cpu)) for cpu in times
+    ]
+
+
+def get_disk_io() -> Optional[tuple[int, int]]:
+    """
+    Returns the bytes read and written by all the disks since boot.
+    """
+    import psutil
+
+    counters = psutil.disk_io_counters()
+    if counters is None:
+        return None
+    return counters.read_bytes, counters.write_bytes
+
+
+# Recolectores para Linux: cada archivo de /proc y /sys se lee de una sola vez,
+# sin procesos externos ni psutil/py-cpuinfo
+
+
+def read_file(path: str) -> Optional[str]:
+    """
+    Returns the whole content of the file, or None if it can't be read.
+    """
+    try:
+        with open(path, "r") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def read_meminfo() -> dict:
+    """
+    Returns /proc/meminfo as name -> bytes.
+    """
+    values = {}
+    for line in read_file("/proc/meminfo").splitlines():
+        name, _, value = line.partition(":")
+        values[name] = int(value.split()[0]) * 1024
+    return values
+
+
+def get_user_info_linux() -> tuple[str, Optional[str]]:
+    """
+    Returns the machine name and the user name.
+    """
+    user = os.getenv("USER") or os.getenv("LOGNAME")
+    if not user:
+        import pwd
+
+        user = pwd.getpwuid(os.getuid()).pw_name
+    return os.uname().nodename, user
+
+
+def get_cpu_info_linux() -> tuple[str, Optional[int], int]:
+    """
+    Returns the CPU brand and its physical and logical cores from /proc/cpuinfo
+    (physical cores are None when it doesn't list them).
+    """
+    brand = None
+    cores = set()
+    logical = 0
+    processor = {}
+    for line in read_file("/proc/cpuinfo").splitlines() + [""]:
+        if not line.strip():
+            # Cada procesador lógico termina con una línea vacía
+            if processor:
+                logical += 1
+                # Sin "physical id" o "core id" (algunas VM) no se pueden contar
+                if "physical id" in processor and "core id" in processor:
+                    cores.add((processor["physical id"], processor["core id"]))
+            processor = {}
+            continue
+        name, _, value = line.partition(":")
+        processor[name.strip()] = value.strip()
+        if brand is None and name.strip() == "model name":
+            brand = value.strip()
+
+    if brand is None:
+        # Algunas arquitecturas (ARM) no tienen "model name"
+        return get_cpu_info()
+    return brand, len(cores) or None, logical or os.cpu_count()
+
+
+def get_gpu_info_linux() -> Optional[str]:
+    """
+    Returns the vendor and PCI id of the GPUs.
+    """
+    if not os.path.isdir("/sys/class/drm"):  # Contenedores y máquinas sin GPU
+        return None
+
+    gpus = []
+    for card in sorted(os.listdir("/sys/class/drm")):
+        # card0, card1... (sin los conectores como card0-HDMI-A-1)
+        if not card.startswith("card") or not card[4:].isdigit():
+            continue
+        uevent = read_file(f"/sys/class/drm/{card}/device/uevent") or ""
+        for line in uevent.splitlines():
+            if line.startswith("PCI_ID="):
+                pci_id = line.split("=", 1)[1].strip()
+                vendor = GPU_VENDORS.get(pci_id.split(":")[0].lower(), "")
+                gpus.append(f"{vendor} {pci_id}".strip())
+    return ", ".join(gpus) or None
+
+
+def get_uptime_info_linux() -> float:
+    """
+    Returns the system uptime in seconds from /proc/uptime.
+    """
+    return float(read_file("/proc/uptime").split()[0])
+
+
+def get_ram_info_linux() -> tuple[int, int, float, int, int]:
+    """
+    Returns the used RAM, total RAM (bytes), the percent used and the used and
+    total swap (bytes), from a single read of /proc/meminfo.
+    """
+    memory = read_meminfo()
+    total = memory["MemTotal"]
+    used = total - memory["MemAvailable"]
+    swap = memory["SwapTotal"] - memory["SwapFree"]
+    return used, total, round(used / total * 100, 1), swap, memory["SwapTotal"]
+
+
+def get_load_info_linux() -> tuple[float, float, float]:
+    """
+    Returns the 1, 5 and 15 minutes load average from /proc/loadavg.
+    """
+    return tuple(float(value) for value in read_file("/proc/loadavg").split()[:3])
+
+
+def get_disk_info_linux(proc: str = "/proc", root: str = "") -> tuple:
+    """
+    Returns (mount, used bytes, total bytes) of every disk in /proc/mounts.
+    With proc and root ("/proc/<pid>" and "/proc/<pid>/root") the disks are
+    the ones of that process.
+    """
+    disks = []
+    devices = set()
+    for line in read_file(f"{proc}/mounts").splitlines():
+        device, mount = line.split()[:2]
+        if not device.startswith("/dev/") or device in devices:
+            continue
+        devices.add(device)
+        # Los espacios de la ruta vienen escritos como \040
+        mount = mount.replace("\\040", " ")
+        try:
+            stat = os.statvfs(root + mount)
+        except OSError:
+            continue
+        total = stat.f_blocks * stat.f_frsize
+        disks.append((mount, total - stat.f_bfree * stat.f_frsize, total))
+    return tuple(disks)
+
+
+def get_shell_info_linux() -> Optional[str]:
+    """
+    Returns the name of the shell that started xq (the parent process).
+    """
+    shell = read_file(f"/proc/{os.getppid()}/comm")
+    return shell.strip() if shell else get_shell_info()
+
+
+def get_package_info_linux(root: str = "") -> tuple:
+    """
+    Returns (manager, count) of the installed packages of every known manager,
+    of the system under root.
+    """
+    packages = []
+    dpkg = read_file(f"{root}/var/lib/dpkg/status")
+    if dpkg:
+        packages.append(
+            ("dpkg", dpkg.count("\nPackage: ") + dpkg.startswith("Package: "))
+        )
+    apk = read_file(f"{root}/lib/apk/db/installed")
+    if apk:
+        packages.append(("apk", apk.count("\nP:") + apk.startswith("P:")))
+    if os.path.isdir(f"{root}/var/lib/pacman/local"):
+        # Además de un directorio por paquete está el archivo ALPM_DB_VERSION
+        count = len(os.listdir(f"{root}/var/lib/pacman/local")) - 1
+        packages.append(("pacman", count))
+    if os.path.isdir(f"{root}/var/lib/flatpak/app"):
+        packages.append(("flatpak", len(os.listdir(f"{root}/var/lib/flatpak/app"))))
+    return tuple(packages)
+
+
+def get_network_info_linux(proc: str = "/proc", root: str = "") -> tuple:
+    """
+    Returns (name, up, rx bytes, tx bytes) of every interface in /proc/net/dev,
+    or in the network namespace of a process with proc and root.
+    """
+    interfaces = []
+    # Las dos primeras líneas son la cabecera
+    for line in read_file(f"{proc}/net/dev").splitlines()[2:]:
+        name, _, counters = line.partition(":")
+        name = name.strip()
+        if name == "lo":
+            continue
+        counters = counters.split()
+        state = read_file(f"{root}/sys/class/net/{name}/operstate") or ""
+        interfaces.append(
+            (name, state.strip() == "up", int(counters[0]), int(counters[8]))
+        )
+    return tuple(interfaces)
+
+
+def get_cpu_times_linux() -> list:
+    """
+    Returns (busy, total) CPU ticks of the whole CPU and then of every core,
+    from /proc/stat.
+    """
+    times = []
+    for line in read_file("/proc/stat").splitlines():
+        if not line.startswith("cpu"):
+            break
+        # user nice system idle iowait irq softirq steal (guest ya va en user)
+        values = [int(value) for value in line.split()[1:9]]
+        total = sum(values)
+        times.append((total - values[3] - values[4], total))
+    return times
+
+
+def get_disk_io_linux() -> tuple[int, int]:
+    """
+    Returns the bytes read and written by the disks since boot, from
+    /proc/diskstats.
+    """
+    # Solo los discos enteros (las particiones se contarían dos veces)
+    disks = {
+        name
+        for name in os.listdir("/sys/block")
+        if not name.startswith(("loop", "ram"))
+    }
+    read = written = 0
+    for line in read_file("/proc/diskstats").splitlines():
+        fields = line.split()
+        if fields[2] in disks:
+            # Sectores leídos y escritos, de 512 bytes
+            read += int(fields[5]) * 512
+            written += int(fields[9]) * 512
+    return read, written
+
+
+# Recolectores para contenedores (cgroup v2): los valores del contenedor en
+# lugar de los del equipo. Cada uno lee sus archivos una sola vez
+
+
+@functools.lru_cache(maxsize=None)
+def get_cgroup_dir() -> Optional[str]:
+    """
+    Returns the cgroup v2 directory of this process when it runs inside a
+    container, or None.
+    """
+    # Docker crea /.dockerenv, Podman /run/.containerenv, Kubernetes define
+    # KUBERNETES_SERVICE_HOST y systemd-nspawn y LXC la variable container
+    in_container = (
+        os.path.exists("/.dockerenv")
+        or os.path.exists("/run/.containerenv")
+        or "KUBERNETES_SERVICE_HOST" in os.environ
+        or "container" in os.environ
+        or os.getenv("XQ_BACKEND") == "container"
+    )
+    if not in_container:
+        return None
+
+    # Sin namespace de cgroup la ruta es la del equipo, con él es la raíz
+    return get_process_cgroup_dir("self") or (
+        CGROUP_ROOT if os.path.exists(f"{CGROUP_ROOT}/memory.max") else None
+    )
+
+
+def get_process_cgroup_dir(pid) -> Optional[str]:
+    """
+    Returns the cgroup v2 directory of the process pid ("self" for this one)
+    if it has a memory limit file, or None.
+    """
+    for line in (read_file(f"/proc/{pid}/cgroup") or "").splitlines():
+        # En cgroup v2 la única línea es "0::/ruta"
+        if line.startswith("0::"):
+            directory = os.path.normpath(CGROUP_ROOT + line[3:].strip())
+            if os.path.exists(os.path.join(directory, "memory.max")):
+                return directory
+    return None
+
+
+def get_ram_info_cgroup(
+    directory: Optional[str] = None,
+) -> tuple[int, int, float, int, int]:
+    """
+    Returns the RAM used by the container (or the cgroup directory), its limit
+    (memory.max, or the host total without a limit), the percent used and the
+    used and total swap of the host.
+    """
+    directory = directory or get_cgroup_dir()
+    used = int(read_file(f"{directory}/memory.current"))
+    # Como docker stats: la caché de archivos inactiva se puede liberar
+    for line in read_file(f"{directory}/memory.stat").splitlines():
+        if line.startswith("inactive_file "):
+            used -= int(line.split()[1])
+            break
+
+    limit = read_file(f"{directory}/memory.max").strip()
+    memory = read_meminfo()
+    total = memory["MemTotal"] if limit == "max" else int(limit)
+    swap = memory["SwapTotal"] - memory["SwapFree"]
+    return used, total, round(used / total * 100, 1), swap, memory["SwapTotal"]
+
+
+def get_cpu_limit_cgroup(directory: Optional[str] = None) -> Optional[float]:
+    """
+    Returns how many CPUs the container (or the cgroup directory) can use
+    (cpu.max), or None without a limit.
+    """
+    directory = directory or get_cgroup_dir()
+    quota, _, period = (read_file(f"{directory}/cpu.max") or "max").partition(" ")
+    if quota == "max":
+        return None
+    return round(int(quota) / int(period), 2)
+
+
+def get_uptime_info_container() -> float:
+    """
+    Returns the seconds since the container started: the host uptime minus the
+    start of the first process of its PID namespace.
+    """
+    # Tras el nombre (que puede tener espacios y paréntesis) el campo 22,
+    # starttime, es el índice 19: ticks desde que arrancó el equipo
+    stat = read_file("/proc/1/stat").rsplit(")", 1)[1].split()
+    start = int(stat[19]) / os.sysconf("SC_CLK_TCK")
+    return round(get_uptime_info_linux() - start, 2)
+
+
+# Funciones para dar formato a la información
+
+
+def get_color_items() -> list[str]:
+    """
+    Returns a list of color items. (Print "██")
+    """
+    from colorama import Style, Fore
+
+    colors = [
+        Fore.BLACK,  # negro
+        Fore.RED,  # rojo
+        Fore.GREEN,  # verde
+        Fore.YELLOW,  # amarillo
+        Fore.BLUE,  # azul
+        Fore.MAGENTA,  # magenta
+        Fore.CYAN,  # cian
+        Fore.WHITE,  # blanco
+    ]
+
+    color_items = [c + "██" + Style.RESET_ALL for c in colors]
+    return color_items
+
+
+def format_uptime(uptime: float) -> str:
+    """
+    Returns a string with the uptime.
+    """
+    if uptime is None:
+        return PLACEHOLDER
+
+    hours, remainder = divmod(int(uptime), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours > 0:
+        uptime_str = f"{hours} hours, {minutes} minutes"
+    elif minutes > 0:
+        uptime_str = f"{minutes} minutes, {seconds} seconds"
+    else:
+        uptime_str = f"{seconds} seconds"
+    return uptime_str
+
+
+def format_date(date: datetime.datetime, settings: dict) -> str:
+    """
+    Returns a string with calendar information.
+    """
+    import calendar
+
+    if date is None:
+        return PLACEHOLDER
+
+    data = settings["date"]
+
+    if data["format_hour"] == "24":
+        if data["format_date"] == "full":
+            return (
+                calendar.day_name[date.weekday()]
+                + ", "
+                + date.strftime("%H:%M:%S")
+                + ", "
+                + date.strftime("%d-%m-%Y")
+            )
+        elif data["format_date"] == "short":
+            return date.strftime("%H:%M") + ", " + date.strftime("%d/%m")
+
+    elif data["format_hour"] == "12":
+        if data["format_date"] == "full":
+            return (
+                calendar.day_name[date.weekday()]
+                + ", "
+                + date.strftime("%I:%M:%S %p")
+                + ", "
+                + date.strftime("%d-%m-%Y")
+            )
+        elif data["format_date"] == "short":
+            return date.strftime("%I:%M %p") + ", " + date.strftime("%d/%m")
+
+
+def format_ram(used: int, total: int, percent: float, settings: dict) -> str:
+    """
+    Returns a string with RAM information.
+    """
+    if used is None:
+        return PLACEHOLDER
+
+    data = settings["ram"]
+
+    if data["unit"].upper() == "GB":  # 8.4/16gb
+        return f"{round(used / (1024.0**3), 2)}/{round(total / (1024.0**3), 2)} GB ({percent}%)"
+
+    elif data["unit"].upper() == "MB":  # 8.4/16gb
+        return f"{round(used / (1024.0**2), 2)}/{round(total / (1024.0**2), 2)} MB ({percent}%)"
+
+
+def format_rate(value: Optional[float]) -> str:
+    """
+    Returns a rate in bytes per second with the largest unit that fits.
+    """
+    if value is None:
+        return PLACEHOLDER
+
+    for unit in ["B", "KB", "MB"]:
+        if value < 1024:
+            return f"{round(value, 1)} {unit}/s"
+        value /= 1024
+    return f"{round(value, 1)} GB/s"
+
+
+def sparkline(values: tuple, maximum: Optional[float] = None) -> str:
+    """
+    Returns the values as a line of bars, scaled to maximum (or the highest
+    value). Missing values are blank.
+    """
+    bars = "▁▂▃▄▅▆▇█"
+    top = maximum or max((value for value in values if value), default=0) or 1
+    return "".join(
+        " " if value is None else bars[min(round(value / top * 7), 7)]
+        for value in values
+    )
+
+
+def format_disk(disks: Optional[tuple]) -> str:
+    """
+    Returns the usage of the root disk (or the first one) in GB.
+    """
+    if not disks:
+        return PLACEHOLDER
+
+    _, used, total = next((disk for disk in disks if disk[0] == "/"), disks[0])
+    percent = round(used / total * 100, 1) if total else 0.0
+    return f"{round(used / (1024.0**3), 2)}/{round(total / (1024.0**3), 2)} GB ({percent}%)"
+
+
+def fetch_data(snapshot: SystemSnapshot, settings: dict) -> dict:
+    """
+    Returns the text of every slot of the template.
+    """
+    cpu = snapshot.cpu or PLACEHOLDER
+    if snapshot.cpu_limit is not None:
+        cpu += f" [{snapshot.cpu_limit:g} CPUs]"
+    if snapshot.cpu_percent is not None:
+        cpu += f" ({snapshot.cpu_percent}%)"
+
+    ram = format_ram(
+        snapshot.ram_used, snapshot.ram_total, snapshot.ram_percent, settings
+    )
+    disk = format_disk(snapshot.disks)
+    load = PLACEHOLDER
+    if snapshot.load_average:
+        load = " ".join(f"{value:.2f}" for value in snapshot.load_average)
+    network = PLACEHOLDER
+    if snapshot.network:
+        network = ", ".join(name for name, up, _, _ in snapshot.network if up)
+
+    # Con métricas (--watch y --daemon) se añaden las gráficas y las velocidades
+    metrics = snapshot.metrics
+    if metrics:
+        cpu += " " + sparkline(metrics["cpu"][-SPARKLINE_WIDTH:], 100)
+        ram += " " + sparkline(metrics["ram"][-SPARKLINE_WIDTH:], 100)
+        disk += (
+            f" R {format_rate(metrics['disk_read'][-1])}"
+            f" W {format_rate(metrics['disk_write'][-1])}"
+        )
+        # Una barra por núcleo
+        load += " " + sparkline(metrics["cores"], 100)
+        network += (
+            f" ↓ {format_rate(metrics['net_rx'][-1])}"
+            f" ↑ {format_rate(metrics['net_tx'][-1])}"
+        )
+
+    packages = PLACEHOLDER
+    if snapshot.packages:
+        packages = ", ".join(
+            f"{count} ({manager})" for manager, count in snapshot.packages
+        )
+
+    return {
+        "machine": snapshot.machine or PLACEHOLDER,
+        "user": snapshot.user or PLACEHOLDER,
+        "os": snapshot.os or PLACEHOLDER,
+        "uptime": format_uptime(snapshot.uptime),
+        "packages": packages,
+        "shell": snapshot.shell or PLACEHOLDER,
+        "cpu": cpu,
+        "gpu": snapshot.gpu or PLACEHOLDER,
+        "ram": ram,
+        "disk": disk,
+        "date": format_date(snapshot.date, settings),
+        "version": snapshot.version,
+        "load": load,
+        "network": network or PLACEHOLDER,
+        **{
+            name: PLACEHOLDER if value is None else str(value)
+            for name, value in (snapshot.extra or {}).items()
+        },
+    }
+
+
+def strip_ansi(text: str) -> str:
+    """
+    Returns the text without ANSI escape sequences.
+    """
+    import re
+
+    return re.sub(r"\x1b\[[0-9;]*[A-Za-z]", "", text)
+
+
+def get_fields(settings: dict) -> tuple:
+    """
+    Returns (name, label, separator) of the fields enabled in the settings.
+    """
+    builtin = {field[0]: field for field in FIELDS}
+    fields = []
+    for name in settings["fields"]:
+        if name in builtin:
+            fields.append(builtin[name])
+        elif load_plugin(name) is not None:
+            fields.append((name, load_plugin(name).label or name.capitalize(), ":\t"))
+    return tuple(fields)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template(color_name: str, fields: tuple) -> tuple:
+    """
+    Builds the art with the given color and fields ((name, label, separator),
+    ...) once and returns (parts, slots): the static text split around the
+    slots and slot name -> index in parts.
+    """
+    from colorama import Style, Fore
+
+    color = getattr(Fore, color_name.upper())
+    color_items = "".join(get_color_items())
+
+    # Cada hueco se marca con \0nombre\0. "@campo" marca dónde empieza la
+    # etiqueta del campo (para redibujarlo en el modo --watch)
+    def field(name, label, separator):
+        return f"\0@{name}\0{color}{label}{Style.RESET_ALL}{separator}\0{name}\0"
+
+    # Dibujo de la izquierda, con todas las filas del mismo ancho. La columna de
+    # la derecha (usuario, campos y colores) empieza en su segunda fila
+    art = f"""
+            {Fore.YELLOW}.++######++.                            
+         .################+                         
+        {Fore.YELLOW} +################-{Style.RESET_ALL}                         
+         {Fore.YELLOW}#################{Style.RESET_ALL}   {Fore.GREEN}###+            +-     
+        {Fore.YELLOW}#################-{Style.RESET_ALL} {Fore.GREEN} .#################      
+       {Fore.YELLOW}-#################{Style.RESET_ALL}  {Fore.GREEN} #################.      
+       {Fore.YELLOW}#################{Style.RESET_ALL}   {Fore.GREEN}.#################       
+      {Fore.YELLOW}+################+{Style.RESET_ALL}   {Fore.GREEN}#################-       
+      {Fore.YELLOW}###+        +####.{Style.RESET_ALL}  {Fore.GREEN}.#################        
+      {Fore.YELLOW}                .{Style.RESET_ALL}   {Fore.GREEN}#################.        
+      {Fore.BLUE}-+##########+{Style.RESET_ALL}      {Fore.GREEN}##################         
+    {Fore.BLUE}+#################     {Fore.GREEN}.############+.          
+    {Fore.BLUE}#################   {Style.BRIGHT}{Fore.YELLOW}.{Style.RESET_ALL}                           
+   {Fore.BLUE}#################.      {Style.BRIGHT}{Fore.YELLOW}#####.       .###        
+  {Fore.BLUE}.#################      {Style.BRIGHT}{Fore.YELLOW}+################+        
+  {Style.RESET_ALL}{Fore.BLUE}+################.      {Style.BRIGHT}{Fore.YELLOW}#################         
+ {Style.RESET_ALL}{Fore.BLUE}.#################      {Style.BRIGHT}{Fore.YELLOW}#################-         
+ {Style.RESET_ALL}{Fore.BLUE}#################-     {Style.BRIGHT}{Fore.YELLOW}-#################          
+{Style.RESET_ALL}{Fore.BLUE}-#.          -####  {Style.BRIGHT}{Fore.YELLOW}   #################.           
+                       {Style.BRIGHT}{Fore.YELLOW}.################+           
+                       {Style.BRIGHT}{Fore.YELLOW}.################.           
+                          {Style.BRIGHT}{Fore.YELLOW}.+#######++.{Style.RESET_ALL}              
+"""
+
+    right = [
+        f"{color}\0machine\0{Style.RESET_ALL}@{color}\0user\0{Style.RESET_ALL}",
+        "-" * 26,
+        *(field(*item) for item in fields),
+        f"{Style.DIM}{color_items}",
+        f"{Style.BRIGHT}{color_items}",
+    ]
+    # Si hay más campos que filas en el dibujo se añaden filas vacías
+    rows = art.split("\n")[1:-1]
+    rows += [" " * 52] * (len(right) + 1 - len(rows))
+    lines = [rows[0]] + [
+        row + (Style.RESET_ALL + right[index] if index < len(right) else "")
+        for index, row in enumerate(rows[1:])
+    ]
+    text = "\n\n" + "\n".join(lines) + "\n   \n    "
+
+    parts = text.split("\0")
+    slots = {parts[index]: index for index in range(1, len(parts), 2)}
+    return tuple(parts), slots
+
+
+@functools.lru_cache(maxsize=None)
+def field_positions(color_name: str, fields: tuple) -> dict:
+    """
+    Returns field name -> (row, column, label) of every field on the screen.
+    """
+    parts, slots = compile_template(color_name, fields)
+    positions = {}
+    for name, _, _ in fields:
+        index = slots[f"@{name}"]
+        before = "".join(parts[:index])
+        row = before.count("\n") + 1
+        column = len(strip_ansi(before.rsplit("\n", 1)[-1])) + 1
+        positions[name] = (row, column, parts[slots[name] - 1])
+
+    return positions
+
+
+def fetch_info(snapshot: SystemSnapshot, settings: dict) -> str:
+    """
+    Returns a string with all system information.
+    """
+    parts, slots = compile_template(settings["color"], get_fields(settings))
+    values = fetch_data(snapshot, settings)
+
+    output = list(parts)
+    for name, index in slots.items():
+        output[index] = values.get(name, "")
+    return "".join(output)
+
+
+# Funciones para leer y guardar los datos
+
+
+def validate_data(data) -> dict:
+    """
+    Returns the data with every setting checked, invalid values use the defaults.
+    """
+    if not isinstance(data, dict):
+        data = {}
+    settings = data.get("settings")
+    if not isinstance(settings, dict):
+        settings = {}
+    ram = settings.get("ram") if isinstance(settings.get("ram"), dict) else {}
+    date = settings.get("date") if isinstance(settings.get("date"), dict) else {}
+
+    color = str(settings.get("color", "")).lower()
+    unit = str(ram.get("unit", "")).lower()
+    format_hour = str(date.get("format_hour", ""))
+    format_date = str(date.get("format_date", ""))
+    # Los nombres que no son campos del dibujo pueden ser plugins: se comprueban
+    # al cargarlos
+    fields = settings.get("fields")
+    if not isinstance(fields, list) or not all(
+        isinstance(name, str) for name in fields
+    ):
+        fields = DEFAULT_SETTINGS["fields"]
+    cache = settings.get("cache") if isinstance(settings.get("cache"), dict) else {}
+    # Las políticas que no son válidas se ignoran
+    cache = {
+        name: {"ttl": policy["ttl"], "policy": policy.get("policy", "ttl")}
+        for name, policy in cache.items()
+        if isinstance(policy, dict)
+        and name not in UNCACHED
+        and type(policy.get("ttl")) in [int, float]
+        and policy["ttl"] >= 0
+        and policy.get("policy", "ttl") in CACHE_POLICIES
+    }
+
+    data["settings"] = {
+        "color": color if color in COLORS else DEFAULT_SETTINGS["color"],
+        "ram": {
+            "unit": unit if unit in ["mb", "gb"] else DEFAULT_SETTINGS["ram"]["unit"]
+        },
+        "date": {
+            "format_hour": (
+                format_hour
+                if format_hour in ["12", "24"]
+                else DEFAULT_SETTINGS["date"]["format_hour"]
+            ),
+            "format_date": (
+                format_date
+                if format_date in ["full", "short"]
+                else DEFAULT_SETTINGS["date"]["format_date"]
+            ),
+        },
+        "fields": list(dict.fromkeys(fields)),
+        "cache": {**DEFAULT_SETTINGS["cache"], **cache},
+    }
+    # La CPU ahora se guarda en la caché de hardware (FACTS_FILE)
+    data.pop("cpu_info", None)
+
+    return data
+
+
+def write_file_atomic(path: str, content: bytes, mode: int = 0o600):
+    """
+    Writes to a temporary file and renames it, readers never see half a file.
+    """
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".xq-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(path: str, data: dict, mode: int = 0o600):
+    """
+    Writes the JSON atomically and its binary copy, with the given permissions.
+    """
+    import json
+
+    write_file_atomic(path, json.dumps(data).encode("utf-8"), mode)
+    write_binary_cache(path, os.stat(path), data)
+
+
+def read_binary_cache(path: str, stat):
+    """
+    Returns the data of the binary copy of path, or None if it is missing or
+    was not generated from the current JSON file (stat).
+    """
+    import marshal
+    import struct
+
+    try:
+        # Ocupa menos de una página: una sola lectura es más rápida que mmap
+        with open(path + BINARY_SUFFIX, "rb") as file:
+            content = file.read()
+        header = struct.unpack_from(BINARY_HEADER, content)
+        if header != (
+            BINARY_MAGIC,
+            marshal.version,
+            stat.st_mtime_ns,
+            stat.st_size,
+            stat.st_ino,
+        ):
+            return None
+        return marshal.loads(content[struct.calcsize(BINARY_HEADER) :])
+    except (OSError, ValueError, EOFError, TypeError, struct.error):
+        return None
+
+
+def write_binary_cache(path: str, stat, data):
+    """
+    Writes the binary copy of the JSON file path (with its stat in the header).
+    """
+    import marshal
+    import struct
+
+    header = struct.pack(
+        BINARY_HEADER,
+        BINARY_MAGIC,
+        marshal.version,
+        stat.st_mtime_ns,
+        stat.st_size,
+        stat.st_ino,
+    )
+    try:
+        # Con los mismos permisos que el JSON
+        write_file_atomic(
+            path + BINARY_SUFFIX, header + marshal.dumps(data), stat.st_mode & 0o777
+        )
+    except (OSError, ValueError):
+        # La copia binaria es opcional, sin ella se lee el JSON
+        pass
+
+
+@contextlib.contextmanager
+def locked(path: str):
+    """
+    Holds an advisory lock on path + ".lock" while the block runs. Only the
+    writers lock, readers never wait because files are replaced atomically.
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        lock = open(path + ".lock", "a")
+    except OSError:
+        # Sin permisos para crear el bloqueo se sigue sin él
+        yield
+        return
+
+    with lock:
+        try:
+            import fcntl
+
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        # El bloqueo se libera al cerrar el archivo
+        yield
+
+
+def read_json(path: str):
+    """
+    Returns the JSON of the file, or None if it is missing or invalid. Uses
+    the binary copy when it is up to date, and creates it when it is not.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    data = read_binary_cache(path, stat)
+    if data is not None:
+        return data
+
+    import json
+
+    try:
+        with open(path, "r") as file:
+            stat = os.fstat(file.fileno())
+            data = json.load(file)
+    except FileNotFoundError:
+        return None
+    except json.decoder.JSONDecodeError as err:
+        print(f"Warning: Error loading data from {path}: {err}", file=sys.stderr)
+        return None
+
+    write_binary_cache(path, stat, data)
+    return data
+
+
+def merge_data(base: dict, overlay: dict) -> dict:
+    """
+    Returns base with the values of overlay on top, merging nested dicts.
+    """
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = merge_data(merged[key], value)
+        merged[key] = value
+    return merged
+
+
+def diff_data(data: dict, base: dict) -> dict:
+    """
+    Returns the values of data that are not the same in base, so that
+    merge_data(base, diff_data(data, base)) == data.
+    """
+    diff = {}
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            value = diff_data(value, base[key])
+            if value:
+                diff[key] = value
+        elif base.get(key, diff) != value:
+            diff[key] = value
+    return diff
+
+
+def load_base_data() -> dict:
+    """
+    Returns the validated settings of the machine, without the user's ones.
+    """
+    return validate_data(read_json(SYSTEM_DATA_FILE) or {})
+
+
+def load_data() -> dict:
+    """
+    Reads the settings of the machine and of the user once and returns the
+    validated data.
+    """
+    data = read_json(DATA_FILE)
+    if data is None and os.path.exists(LEGACY_DATA_FILE):
+        data = import_legacy_data()
+    if not isinstance(data, dict):
+        data = {}
+    # El archivo del usuario solo tiene lo que cambia (ver save_data), se
+    # completa con los ajustes ya validados del equipo
+    return validate_data(merge_data(load_base_data(), data))
+
+
+def import_legacy_data():
+    """
+    Saves the settings of LEGACY_DATA_FILE as the user's ones and returns
+    them, or None if it can't be read or saved.
+    """
+    import json
+
+    with locked(DATA_FILE):
+        # Otro proceso pudo importarlo mientras se esperaba el bloqueo
+        data = read_json(DATA_FILE)
+        if data is not None:
+            return data
+        try:
+            # Sin read_json: no se crea una copia binaria en el directorio
+            with open(LEGACY_DATA_FILE, "r") as file:
+                legacy = validate_data(json.load(file))
+            data = diff_data(legacy, load_base_data())
+            # Se guarda aunque no cambie nada para no volver a importarlo
+            write_json_atomic(DATA_FILE, data)
+        except (OSError, json.decoder.JSONDecodeError) as err:
+            print(
+                f"Warning: Error importing the settings of {LEGACY_DATA_FILE}: {err}",
+                file=sys.stderr,
+            )
+            return None
+
+    print(
+        f"Warning: Imported the settings of {os.path.abspath(LEGACY_DATA_FILE)}"
+        f" into {DATA_FILE}, the old file is no longer used.",
+        file=sys.stderr,
+    )
+    return data
+
+
+def write_data(data: dict) -> bool:
+    """
+    Writes the settings that differ from the machine ones to the user's file
+    in a single atomic write, only if something changed. The caller holds
+    the lock. Returns False if the file could not be written.
+    """
+    try:
+        # El diff se hace sobre los valores ya validados, como los que se usan
+        overlay = diff_data(data, load_base_data())
+        # Sin archivo tampoco hay cambios que guardar
+        if (read_json(DATA_FILE) or {}) != overlay:
+            write_json_atomic(DATA_FILE, overlay)
+    except OSError as err:
+        # Si no se puede guardar el archivo, se ignora
+        print(f"Warning: Error saving data to {DATA_FILE}: {err}", file=sys.stderr)
+        return False
+    return True
+
+
+def save_data(data: dict) -> bool:
+    """
+    Writes the settings like write_data, under the lock of the user's file.
+    """
+    with locked(DATA_FILE):
+        return write_data(data)
+
+
+# Funciones para la caché de datos del hardware
+
+
+def get_boot_id() -> str:
+    """
+    Returns an id that changes on every reboot.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as file:
+            return file.read().strip()
+    except OSError:
+        import psutil
+
+        return str(int(psutil.boot_time()))
+
+
+def get_facts_key() -> str:
+    """
+    Returns the key of the facts cache: boot id plus a hardware fingerprint.
+    """
+    import platform
+
+    return "|".join(
+        [get_boot_id(), platform.node(), platform.machine(), str(os.cpu_count())]
+    )
+
+
+def collect_facts() -> dict:
+    """
+    Collects the slow, rarely changing hardware facts.
+    """
+    return {
+        "cpu": BACKEND["cpu"]()[0],
+        "os": get_os_info(),
+        "gpu": BACKEND["gpu"]() if "gpu" in BACKEND else None,
+    }
+
+
+def read_facts(path: str, key: str):
+    """
+    Returns the cached facts of the file if they are valid for the key, else
+    None.
+    """
+    cache = read_json(path)
+    try:
+        if cache["version"] == FACTS_VERSION and cache["key"] == key:
+            return cache["facts"]
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def load_facts() -> dict:
+    """
+    Returns the cached hardware facts (the machine ones or else the user's),
+    collecting them again after a reboot, a hardware change or a new cache
+    version.
+    """
+    key = get_facts_key()
+    for path in [SHARED_FACTS_FILE, FACTS_FILE]:
+        facts = read_facts(path, key)
+        if facts is not None:
+            return facts
+
+    # Solo un proceso obtiene la información, los demás esperan y la leen
+    with locked(FACTS_FILE):
+        facts = read_facts(FACTS_FILE, key)
+        if facts is not None:
+            return facts
+
+        facts = collect_facts()
+        try:
+            write_json_atomic(
+                FACTS_FILE, {"version": FACTS_VERSION, "key": key, "facts": facts}
+            )
+        except OSError as err:
+            # Si no se puede guardar el archivo, se ignora
+            print(
+                f"Warning: Error saving hardware facts to {FACTS_FILE}: {err}",
+                file=sys.stderr,
+            )
+
+    return facts
+
+
+def update_shared_facts() -> bool:
+    """
+    Collects the hardware facts and saves them to the machine cache, readable
+    by every user. Meant to run as root once per boot.
+    """
+    facts = collect_facts()
+    try:
+        with locked(SHARED_FACTS_FILE):
+            write_json_atomic(
+                SHARED_FACTS_FILE,
+                {"version": FACTS_VERSION, "key": get_facts_key(), "facts": facts},
+                0o644,
+            )
+    except OSError as err:
+        print(
+            f"Could not save the hardware facts to {SHARED_FACTS_FILE}: {err}",
+            file=sys.stderr,
+        )
+        return False
+
+    print(f"Hardware facts saved to {SHARED_FACTS_FILE}.")
+    return True
+
+
+# Ejecución de los recolectores
+
+
+class Collector(NamedTuple):
+    """
+    How to collect one value: the built-in collectors and the plugins.
+    """
+
+    name: str
+    function: Callable[[], Any]
+    # "cheap" y "slow" se ejecutan cada vez (slow con más tiempo); el valor de
+    # "cached" se guarda y se reutiliza durante ttl segundos
+    cost: str = "cheap"
+    ttl: float = 0.0
+    # Prefijos de sys.platform en los que funciona, vacío para todos
+    platforms: tuple = ()
+    timeout: Optional[float] = None  # Según el coste si es None
+    label: Optional[str] = None  # Etiqueta en el dibujo (plugins)
+
+
+# Tiempo máximo en segundos de cada coste
+COST_TIMEOUTS = {"cheap": 1.0, "slow": 5.0, "cached": 5.0}
+
+# Recolectores de cada plataforma (y de los contenedores). Se elige una vez al
+# arrancar.
+BACKENDS = {
+    "linux": {
+        "user": get_user_info_linux,
+        "cpu": get_cpu_info_linux,
+        "gpu": get_gpu_info_linux,
+        "uptime": get_uptime_info_linux,
+        "ram": get_ram_info_linux,
+        "load": get_load_info_linux,
+        "disks": get_disk_info_linux,
+        "shell": get_shell_info_linux,
+        "terminal": get_terminal_info,
+        "packages": get_package_info_linux,
+        "network": get_network_info_linux,
+        "cpu_times": get_cpu_times_linux,
+        "disk_io": get_disk_io_linux,
+    },
+    "generic": {
+        "user": get_user_info,
+        "cpu": get_cpu_info,
+        "uptime": get_uptime_info,
+        "ram": get_ram_info,
+        "load": get_load_info,
+        "disks": get_disk_info,
+        "shell": get_shell_info,
+        "terminal": get_terminal_info,
+        "network": get_network_info,
+        "cpu_times": get_cpu_times,
+        "disk_io": get_disk_io,
+    },
+}
+BACKENDS["container"] = {
+    **BACKENDS["linux"],
+    "uptime": get_uptime_info_container,
+    "ram": get_ram_info_cgroup,
+    "cpu_limit": get_cpu_limit_cgroup,
+}
+
+
+def get_backend_name() -> str:
+    """
+    Returns the name of the collectors to use: XQ_BACKEND if set (and usable),
+    otherwise "container" inside a cgroup v2 container, "linux" or "generic".
+    """
+    name = os.getenv("XQ_BACKEND")
+    # Sin directorio de cgroup v2 el backend de contenedores no puede leer nada
+    if name == "container" and not get_cgroup_dir():
+        print(
+            "Warning: XQ_BACKEND=container but there is no cgroup v2 directory,"
+            " ignoring it",
+            file=sys.stderr,
+        )
+        name = None
+    if name in BACKENDS:
+        return name
+    if not sys.platform.startswith("linux"):
+        return "generic"
+    return "container" if get_cgroup_dir() else "linux"
+
+
+# Los que no forman parte de la información: "cpu" y "gpu" solo se usan para la
+# caché de hardware y los contadores solo para las métricas
+PROBES = ["cpu", "gpu", "cpu_times", "disk_io"]
+BACKEND = BACKENDS[get_backend_name()]
+
+# Los recolectores se ejecutan a la vez, así que la información tarda lo que el
+# más lento y no la suma de todos. "facts" es "slow" porque tras reiniciar puede
+# consultar py-cpuinfo (~1 s).
+COSTS = {"facts": "slow", "packages": "slow", "disks": "slow"}
+TIMEOUTS = {"user": 0.5, "date": 0.5, "packages": 2.0, "disks": 2.0}
+# Recolectores que no se pueden guardar en la caché: la fecha (datetime) no se
+# puede escribir en JSON y siempre tiene que ser la actual
+UNCACHED = ["date"]
+COLLECTORS = {
+    name: Collector(
+        name, function, COSTS.get(name, "cheap"), timeout=TIMEOUTS.get(name)
+    )
+    for name, function in {
+        "facts": load_facts,
+        "date": get_calendar_info,
+        **BACKEND,
+    }.items()
+    if name not in PROBES
+}
+
+
+def run_collectors(collectors: dict) -> dict:
+    """
+    Runs every collector in its own thread and waits for each one at most its
+    timeout. Returns name -> value, None for the ones that failed or timed out.
+    """
+    import threading
+
+    results = {}
+
+    def run(name, function):
+        try:
+            results[name] = function()
+        except Exception as err:
+            print(f"Warning: Error collecting {name}: {err}", file=sys.stderr)
+
+    start = time.monotonic()
+    threads = []
+    for name, collector in collectors.items():
+        # Hilos daemon: uno que se quede colgado no impide que el script termine
+        thread = threading.Thread(
+            target=run, args=(name, collector.function), daemon=True
+        )
+        thread.start()
+        threads.append(
+            (name, thread, collector.timeout or COST_TIMEOUTS[collector.cost])
+        )
+
+    for name, thread, timeout in threads:
+        thread.join(max(0.0, start + timeout - time.monotonic()))
+
+    return {name: results.get(name) for name in collectors}
+
+
+def get_plugins() -> list:
+    """
+    Returns the entry points of the installed plugins, without importing them.
+    """
+    from importlib.metadata import entry_points
+
+    points = entry_points()
+    # Antes de Python 3.10 es un diccionario de grupos
+    if hasattr(points, "select"):
+        return list(points.select(group=PLUGIN_GROUP))
+    return list(points.get(PLUGIN_GROUP, []))
+
+
+@functools.lru_cache(maxsize=None)
+def load_plugin(name: str) -> Optional[Collector]:
+    """
+    Returns the collector of the plugin with that name, importing only its
+    module, or None if it is not installed or fails to load.
+    """
+    for point in get_plugins():
+        if point.name != name:
+            continue
+        try:
+            plugin = point.load()
+            # Un diccionario, un objeto o módulo con los atributos de Collector,
+            # o solo la función
+            if isinstance(plugin, dict):
+                collector = Collector(**{"name": name, **plugin})
+            elif hasattr(plugin, "function"):
+                collector = Collector(
+                    name,
+                    **{
+                        key: getattr(plugin, key)
+                        for key in Collector._fields[1:]
+                        if hasattr(plugin, key)
+                    },
+                )
+            else:
+                collector = Collector(name, plugin)
+            if collector.cost not in COST_TIMEOUTS:
+                raise ValueError(f"unknown cost '{collector.cost}'")
+        except Exception as err:
+            print(f"Warning: Error loading the {name} plugin: {err}", file=sys.stderr)
+            return None
+        return collector._replace(name=name, platforms=tuple(collector.platforms))
+
+    print(f"Warning: Unknown field '{name}'.", file=sys.stderr)
+    return None
+
+
+def select_collectors(fields: list, everything: bool = False) -> dict:
+    """
+    Returns the collectors that the fields need (every built-in one if
+    everything) and the plugins among them that run on this platform.
+    """
+    if everything:
+        names = set(COLLECTORS)
+    else:
+        # El uptime y la RAM también se guardan en el historial
+        names = {"user", "uptime", "ram"}
+        for name in fields:
+            names.update(FIELD_COLLECTORS.get(name, []))
+    collectors = {name: COLLECTORS[name] for name in COLLECTORS if name in names}
+
+    # Los plugins solo se importan si están activados
+    for name in fields:
+        if name in FIELD_COLLECTORS:
+            continue
+        plugin = load_plugin(name)
+        if plugin and sys.platform.startswith(plugin.platforms or ("",)):
+            collectors[name] = plugin
+    return collectors
+
+
+def run_cached_collectors(collectors: dict, policies: dict) -> dict:
+    """
+    Runs the collectors like run_collectors, but takes from the cache file the
+    values that have not expired. A collector is cached when the settings give
+    it a policy, or with its own ttl when its cost is "cached".
+    """
+    # Nombre -> (ttl, política). Los ajustes tienen prioridad sobre el recolector
+    cached = {}
+    for name, collector in collectors.items():
+        if name in UNCACHED:
+            continue
+        if name in policies:
+            cached[name] = (policies[name]["ttl"], policies[name]["policy"])
+        elif collector.cost == "cached":
+            cached[name] = (collector.ttl, "ttl")
+    cached = {name: policy for name, policy in cached.items() if policy[0] > 0}
+    if not cached:
+        return run_collectors(collectors)
+
+    now = time.time()
+    # Con la política "boot" el valor también caduca al reiniciar
+    boot_id = None
+    if any(policy == "boot" for _, policy in cached.values()):
+        boot_id = get_boot_id()
+
+    cache = read_json(CACHE_FILE) or {}
+    fresh = {}
+    for name, (ttl, policy) in cached.items():
+        entry = cache.get(name)
+        if (
+            isinstance(entry, dict)
+            and 0 <= now - entry.get("time", 0) < ttl
+            and (policy != "boot" or entry.get("boot") == boot_id)
+        ):
+            fresh[name] = entry.get("value")
+
+    results = run_collectors(
+        {name: collector for name, collector in collectors.items() if name not in fresh}
+    )
+
+    updated = {
+        name: {
+            "time": now,
+            "expires": now + ttl,
+            "boot": boot_id,
+            "value": results[name],
+        }
+        for name, (ttl, _) in cached.items()
+        if name not in fresh and results[name] is not None
+    }
+    if updated:
+        try:
+            with locked(CACHE_FILE):
+                # Se descartan los valores caducados, como los de campos que ya
+                # no se muestran, para que el archivo no crezca
+                entries = {
+                    name: entry
+                    for name, entry in (read_json(CACHE_FILE) or {}).items()
+                    if isinstance(entry, dict) and entry.get("expires", 0) > now
+                }
+                write_json_atomic(CACHE_FILE, {**entries, **updated})
+        except (OSError, TypeError) as err:
+            # Si no se puede guardar (o el valor no se puede guardar en JSON), se ignora
+            print(
+                f"Warning: Error saving the cache to {CACHE_FILE}: {err}",
+                file=sys.stderr,
+            )
+
+    return {
+        name: fresh[name] if name in fresh else results[name] for name in collectors
+    }
+
+
+def collect_snapshot(
+    data: dict, everything: bool = False, sampler: Optional[dict] = None
+) -> SystemSnapshot:
+    """
+    Collects the values of the fields enabled in the settings (every value if
+    everything) once and returns them as a SystemSnapshot. With a sampler the
+    METRICS_COLLECTORS run in the same pass, their results are sampled and
+    the metrics are added to the snapshot.
+    """
+    fields = data["settings"]["fields"]
+    collectors = select_collectors(fields, everything)
+    if sampler is not None:
+        # La RAM y la red de la muestra son las mismas que las del dibujo
+        collectors.update(METRICS_COLLECTORS)
+    results = run_cached_collectors(collectors, data["settings"]["cache"])
+    facts = results.get("facts") or {}
+    machine, user = results.get("user") or (None, None)
+    # La RAM y la swap salen de la misma lectura. La caché de versiones
+    # anteriores guarda la RAM sin la swap
+    ram = tuple(results.get("ram") or (None, None, None))
+    ram_used, ram_total, ram_percent, swap_used, swap_total = (ram + (None, None))[:5]
+
+    snapshot = SystemSnapshot(
+        machine=machine,
+        user=user,
+        os=facts.get("os"),
+        uptime=results.get("uptime"),
+        cpu=facts.get("cpu"),
+        ram_used=ram_used,
+        ram_total=ram_total,
+        ram_percent=ram_percent,
+        date=results.get("date"),
+        version=VERSION,
+        swap_used=swap_used,
+        swap_total=swap_total,
+        load_average=results.get("load"),
+        disks=results.get("disks"),
+        gpu=facts.get("gpu"),
+        shell=results.get("shell"),
+        terminal=results.get("terminal"),
+        packages=results.get("packages"),
+        network=results.get("network"),
+        cpu_limit=results.get("cpu_limit"),
+        extra={
+            name: value
+            for name, value in results.items()
+            if name not in COLLECTORS and name not in METRICS_COLLECTORS
+        }
+        or None,
+    )
+    if sampler is None:
+        return snapshot
+
+    sample_metrics(sampler, results)
+    return apply_metrics(snapshot, sampler)
+
+
+# Funciones para manipular argumentos de línea de comandos
+
+
+def delete_data():
+    """
+    Function to delete data.
+    """
+    deleted = False
+    for path in [DATA_FILE, FACTS_FILE, CACHE_FILE]:
+        if os.path.exists(path + BINARY_SUFFIX):
+            os.remove(path + BINARY_SUFFIX)
+        if os.path.exists(path):
+            os.remove(path)
+            deleted = True
+    for path in history_files():
+        os.remove(path)
+        deleted = True
+
+    if deleted:
+        print("All data deleted.")
+    else:
+        print("No data to delete.")
+
+
+def change_color(color):
+    """
+    Function to change color.
+    """
+    errors = apply_settings([("color", color)])
+    if errors:
+        print(errors[0].partition(": ")[2])
+    else:
+        print(f"Color changed to '{color.lower()}'.")
+
+
+SETTING_KEYS = [
+    "color",
+    "ram.unit",
+    "date.format_hour",
+    "date.format_date",
+    "fields",
+    "cache.<collector>.ttl",
+    "cache.<collector>.policy",
+]
+
+
+def set_setting(settings: dict, key: str, value) -> Optional[str]:
+    """
+    Changes one setting (a key like "ram.unit") in settings. Returns None, or
+    the error message if the key or the value are not valid.
+    """
+    if isinstance(value, str):
+        value = value.strip()
+    parts = key.strip().split(".")
+    section = parts[0].lower()
+
+    if section == "color" and len(parts) == 1:
+        if str(value).lower() not in COLORS:
+            return f"Invalid color. Available colors are: {', '.join(COLORS)}."
+        settings["color"] = str(value).lower()
+
+    elif section == "ram" and parts[1:] == ["unit"]:
+        if str(value).lower() not in ["mb", "gb"]:
+            return "Invalid unit. Available units are: 'MB' or 'GB'."
+        settings["ram"]["unit"] = str(value).lower()
+
+    elif section == "date" and parts[1:] == ["format_hour"]:
+        if str(value) not in ["12", "24"]:
+            return "Invalid hour format. Available formats are: '12' or '24'."
+        settings["date"]["format_hour"] = str(value)
+
+    elif section == "date" and parts[1:] == ["format_date"]:
+        if str(value).lower() not in ["full", "short"]:
+            return "Invalid date format. Available formats are: 'full' or 'short'."
+        settings["date"]["format_date"] = str(value).lower()
+
+    elif section == "fields" and len(parts) == 1:
+        # Una lista (al importar) o nombres separados por comas
+        fields = value.split(",") if isinstance(value, str) else value
+        available = list(FIELD_COLLECTORS) + [point.name for point in get_plugins()]
+        if isinstance(fields, list) and all(isinstance(name, str) for name in fields):
+            fields = [name.strip().lower() for name in fields if name.strip()]
+        if (
+            not isinstance(fields, list)
+            or not fields
+            or not all(isinstance(name, str) and name in available for name in fields)
+        ):
+            return f"Invalid fields. Available fields are: {', '.join(available)}."
+        settings["fields"] = list(dict.fromkeys(fields))
+
+    elif section == "cache" and len(parts) == 3 and parts[2] in ["ttl", "policy"]:
+        name = parts[1]
+        available = [name for name in COLLECTORS if name not in UNCACHED]
+        available += [point.name for point in get_plugins()]
+        if name not in available:
+            return (
+                f"Invalid collector '{name}'. Available collectors are: "
+                f"{', '.join(available)}."
+            )
+        policy = dict(settings["cache"].get(name, {"ttl": 0.0, "policy": "ttl"}))
+        if parts[2] == "ttl":
+            try:
+                # True y False también son números para float()
+                ttl = -1.0 if isinstance(value, bool) else float(value)
+            except (TypeError, ValueError):
+                ttl = -1.0
+            if not ttl >= 0:
+                return "Invalid ttl. Enter the seconds (0 disables the cache)."
+            policy["ttl"] = ttl
+        else:
+            if value not in CACHE_POLICIES:
+                return "Invalid policy. Available policies are: 'ttl' or 'boot'."
+            policy["policy"] = value
+        settings["cache"] = {**settings["cache"], name: policy}
+
+    else:
+        return f"Unknown setting '{key}'. Available settings are: {', '.join(SETTING_KEYS)}."
+
+    return None
+
+
+def flatten_settings(settings: dict, prefix: str = "") -> list[tuple[str, object]]:
+    """
+    Returns the (key, value) pairs of a settings document, like
+    ("ram.unit", "gb"), in the order of the document.
+    """
+    pairs = []
+    for key, value in settings.items():
+        if isinstance(value, dict):
+            pairs += flatten_settings(value, f"{prefix}{key}.")
+        else:
+            pairs.append((prefix + key, value))
+    return pairs
+
+
+def apply_settings(pairs: list, replace: bool = False) -> list[str]:
+    """
+    Changes every (key, value) setting and saves them in a single write.
+    Nothing is saved if any of them is invalid; returns the error messages.
+    With replace the pairs are applied over the machine settings instead of
+    the user's ones.
+    """
+    # Los ajustes se leen con el bloqueo: si otro proceso los cambió mientras
+    # tanto (por ejemplo, durante una pregunta de -s) no se pierden sus cambios
+    with locked(DATA_FILE):
+        data = load_base_data() if replace else load_data()
+        errors = []
+        for key, value in pairs:
+            error = set_setting(data["settings"], key, value)
+            if error:
+                errors.append(f"{key}: {error}")
+        if errors:
+            return errors
+
+        if not write_data(data):
+            return [f"{DATA_FILE}: The settings were not saved."]
+    compile_template.cache_clear()
+    field_positions.cache_clear()
+    return []
+
+
+def change_settings(setting, value):
+    """
+    Function to change settings. The values are asked by run_cli.
+    """
+    if setting == "ram":
+        pairs = [("ram.unit", value)]
+        message = f"RAM unit changed to '{value.lower()}'."
+
+    elif setting == "date":
+        # "formato_hora formato_fecha", por ejemplo "24 full"
+        format_hour, _, format_date = value.partition(" ")
+        pairs = [("date.format_hour", format_hour), ("date.format_date", format_date)]
+        message = "Date format changed successfully."
+
+    elif setting == "cache":
+        # "nombre ttl [política]", por ejemplo "packages 600 ttl"
+        parts = value.split()
+        name, ttl, policy = (parts + ["", "", "ttl"][len(parts) :])[:3]
+        pairs = [(f"cache.{name}.ttl", ttl), (f"cache.{name}.policy", policy)]
+        message = f"Cache of '{name}' changed to {ttl} seconds ({policy})."
+
+    elif setting == "fields":
+        pairs = [("fields", value)]
+        message = "Fields changed successfully."
+
+    else:
+        pairs = [(setting, value)]
+        message = "Settings changed successfully."
+
+    errors = apply_settings(pairs)
+    # Sin repetir el mensaje si las dos partes tienen el mismo error
+    for error in dict.fromkeys(error.partition(": ")[2] for error in errors):
+        print(error)
+    if not errors:
+        print(message)
+
+
+def run_config(action: str, values: list, data: dict) -> bool:
+    """
+    Runs "xq config": shows the settings, or changes many of them (set
+    key=value ..., or import a settings document) in one validated write.
+    """
+    import json
+
+    if action == "show":
+        print(json.dumps(data["settings"], indent=2))
+        return True
+
+    if action == "set":
+        pairs = []
+        for item in values:
+            key, separator, value = item.partition("=")
+            pairs.append((key, value) if separator else (item, None))
+        invalid = [key for key, value in pairs if value is None]
+        if invalid:
+            print(
+                f"Invalid settings: {', '.join(invalid)}. Use key=value.",
+                file=sys.stderr,
+            )
+            return False
+    else:
+        # El documento sustituye a los ajustes del usuario, con el mismo
+        # formato que settings.json o solo el contenido de "settings"
+        path = values[0]
+        try:
+            if path == "-":
+                document = json.load(sys.stdin)
+            else:
+                with open(path, "r") as file:
+                    document = json.load(file)
+        except (OSError, json.decoder.JSONDecodeError) as err:
+            print(f"Error reading settings from {path}: {err}", file=sys.stderr)
+            return False
+        if isinstance(document, dict) and isinstance(document.get("settings"), dict):
+            document = document["settings"]
+        if not isinstance(document, dict):
+            print(
+                f"Error reading settings from {path}: expected a JSON object.",
+                file=sys.stderr,
+            )
+            return False
+        pairs = flatten_settings(document)
+
+    errors = apply_settings(pairs, replace=action == "import")
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors:
+        print("No settings were changed.", file=sys.stderr)
+        return False
+    print(f"Settings saved to {DATA_FILE}.")
+    return True
+
+
+# Formatos para otros programas (sin colores ni dibujo)
+
+OUTPUT_FORMATS = ["json", "ndjson", "env"]
+
+
+def snapshot_to_dict(snapshot: SystemSnapshot) -> dict:
+    """
+    Returns the raw snapshot values with their units in the key names.
+    """
+    return {
+        "machine": snapshot.machine,
+        "user": snapshot.user,
+        "os": snapshot.os,
+        "cpu": snapshot.cpu,
+        "cpu_percent": snapshot.cpu_percent,
+        "cpu_limit": snapshot.cpu_limit,
+        "uptime_seconds": snapshot.uptime,
+        "ram_used_bytes": snapshot.ram_used,
+        "ram_total_bytes": snapshot.ram_total,
+        "ram_percent": snapshot.ram_percent,
+        "swap_used_bytes": snapshot.swap_used,
+        "swap_total_bytes": snapshot.swap_total,
+        "load_average": snapshot.load_average,
+        "disks": snapshot.disks,
+        "gpu": snapshot.gpu,
+        "shell": snapshot.shell,
+        "terminal": snapshot.terminal,
+        "packages": snapshot.packages,
+        "network": snapshot.network,
+        "metrics": snapshot.metrics,
+        "extra": snapshot.extra,
+        "date": snapshot.date.isoformat() if snapshot.date else None,
+        "version": snapshot.version,
+    }
+
+
+def snapshot_from_dict(values: dict) -> SystemSnapshot:
+    """
+    Returns the snapshot of the values of snapshot_to_dict (for example read
+    back from NDJSON).
+    """
+    values = {
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in values.items()
+    }
+    date = values.get("date")
+    return SystemSnapshot(
+        machine=values.get("machine"),
+        user=values.get("user"),
+        os=values.get("os"),
+        uptime=values.get("uptime_seconds"),
+        cpu=values.get("cpu"),
+        ram_used=values.get("ram_used_bytes"),
+        ram_total=values.get("ram_total_bytes"),
+        ram_percent=values.get("ram_percent"),
+        date=datetime.datetime.fromisoformat(date) if date else None,
+        version=values.get("version") or VERSION,
+        cpu_percent=values.get("cpu_percent"),
+        metrics=values.get("metrics"),
+        swap_used=values.get("swap_used_bytes"),
+        swap_total=values.get("swap_total_bytes"),
+        load_average=values.get("load_average"),
+        disks=values.get("disks"),
+        gpu=values.get("gpu"),
+        shell=values.get("shell"),
+        terminal=values.get("terminal"),
+        packages=values.get("packages"),
+        network=values.get("network"),
+        cpu_limit=values.get("cpu_limit"),
+        extra=values.get("extra"),
+    )
+
+
+def format_snapshot(snapshot: SystemSnapshot, output_format: str) -> str:
+    """
+    Returns the snapshot as JSON, NDJSON (one line) or KEY=value lines.
+    """
+    import json
+
+    values = snapshot_to_dict(snapshot)
+
+    if output_format == "json":
+        return json.dumps(values, indent=2)
+    elif output_format == "ndjson":
+        return json.dumps(values, separators=(",", ":"))
+    elif output_format == "env":
+        import shlex
+
+        # Las listas y diccionarios se guardan como JSON en una sola variable
+        return "\n".join(
+            f"XQ_{key.upper()}="
+            + shlex.quote(
+                ""
+                if value is None
+                else (
+                    json.dumps(value, separators=(",", ":"))
+                    if isinstance(value, (list, tuple, dict))
+                    else str(value)
+                )
+            )
+            for key, value in values.items()
+        )
+
+
+# Modo batch: varios equipos o contenedores a la vez
+
+# Número de hilos por defecto para el modo batch
+BATCH_JOBS = 8
+# Segundos que puede tardar un objetivo cmd:<comando> (por ejemplo, un ssh)
+BATCH_TIMEOUT = 30.0
+
+
+def read_os_release(root: str):
+    """
+    Returns PRETTY_NAME from the os-release file under root, or None.
+    """
+    for path in ["etc/os-release", "usr/lib/os-release"]:
+        try:
+            with open(os.path.join(root, path), "r") as file:
+                for line in file:
+                    if line.startswith("PRETTY_NAME="):
+                        return line.split("=", 1)[1].strip().strip('"')
+        except OSError:
+            continue
+    return None
+
+
+def collect_proc_target(pid: int, host: SystemSnapshot) -> SystemSnapshot:
+    """
+    Returns the snapshot of the container that runs the process pid, reading
+    its files through /proc/<pid>/root and its cgroup. The CPU and GPU are
+    the host hardware; the values that can't be read for the container
+    (user, shell, swap, load...) are None.
+    """
+    import psutil
+
+    proc = f"/proc/{pid}"
+    root = f"{proc}/root"
+    cgroup = get_process_cgroup_dir(pid)
+
+    def read(function, *args):
+        try:
+            return function(*args)
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+
+    machine = read_file(os.path.join(root, "etc/hostname"))
+    ram = (cgroup and read(get_ram_info_cgroup, cgroup)) or (None, None, None)
+    return SystemSnapshot(
+        machine=machine.strip() if machine else None,
+        user=None,
+        os=read_os_release(root),
+        uptime=time.time() - psutil.Process(pid).create_time(),
+        cpu=host.cpu,
+        ram_used=ram[0],
+        ram_total=ram[1],
+        ram_percent=ram[2],
+        date=host.date,
+        version=host.version,
+        disks=read(get_disk_info_linux, proc, root),
+        gpu=host.gpu,
+        packages=read(get_package_info_linux, root),
+        network=read(get_network_info_linux, proc, root),
+        cpu_limit=cgroup and read(get_cpu_limit_cgroup, cgroup),
+    )
+
+
+def collect_cmd_target(command: str) -> dict:
+    """
+    Runs a command that prints xq NDJSON (for example over ssh) and returns
+    its values. The command and its children are killed after BATCH_TIMEOUT
+    seconds.
+    """
+    import json
+    import signal
+    import subprocess
+
+    # En su propia sesión para poder matar también a sus hijos (ssh...)
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=BATCH_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+        process.communicate()
+        raise TimeoutError(f"command timed out after {BATCH_TIMEOUT:g} seconds")
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def collect_target(target: str, host: SystemSnapshot) -> dict:
+    """
+    Collects one target and returns its NDJSON report.
+    """
+    start = time.perf_counter()
+    report = {"target": target}
+    try:
+        kind, _, value = target.partition(":")
+        if kind == "local":
+            values = snapshot_to_dict(host)
+        elif kind == "proc":
+            values = snapshot_to_dict(collect_proc_target(int(value), host))
+        elif kind == "cmd":
+            values = collect_cmd_target(value)
+        else:
+            raise ValueError("unknown target, use local, proc:<pid> or cmd:<command>")
+        report.update(ok=True, values=values)
+    except Exception as err:
+        report.update(ok=False, error=str(err))
+
+    report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return report
+
+
+def run_batch(data: dict, targets_file: str, jobs: int):
+    """
+    Collects every target of the file (one per line) with a pool of jobs
+    threads and prints one NDJSON line per target as soon as it finishes.
+    """
+    import json
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if targets_file == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(targets_file, "r") as file:
+            lines = file.read().splitlines()
+    targets = [
+        line.strip() for line in lines if line.strip() and not line.startswith("#")
+    ]
+
+    start = time.perf_counter()
+    # La información del equipo local se obtiene una vez y la comparten los objetivos
+    host = collect_snapshot(data, everything=True)
+    elapsed = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(collect_target, target, host) for target in targets]
+        for future in as_completed(futures):
+            report = future.result()
+            elapsed.append(report["elapsed_ms"])
+            print(json.dumps(report, separators=(",", ":")), flush=True)
+
+    total = (time.perf_counter() - start) * 1000
+    if elapsed:
+        print(
+            f"{len(elapsed)} targets in {total:.1f} ms,"
+            f" {sum(elapsed) / len(elapsed):.1f} ms per target on average.",
+            file=sys.stderr,
+        )
+
+
+# Exportar el dibujo a HTML, SVG o PNG (para paneles web)
+
+EXPORT_FORMATS = ["html", "svg", "png"]
+# Colores de la terminal: los 8 normales y los 8 brillantes (Style.BRIGHT)
+EXPORT_PALETTE = [
+    [
+        "#000000",
+        "#cd3131",
+        "#0dbc79",
+        "#e5e510",
+        "#2472c8",
+        "#bc3fbc",
+        "#11a8cd",
+        "#e5e5e5",
+    ],
+    [
+        "#666666",
+        "#f14c4c",
+        "#23d18b",
+        "#f5f543",
+        "#3b8eea",
+        "#d670d6",
+        "#29b8db",
+        "#ffffff",
+    ],
+]
+EXPORT_FOREGROUND = "#cccccc"
+EXPORT_BACKGROUND = "#1e1e1e"
+EXPORT_FONT_SIZE = 14
+# Fuentes monoespaciadas que se prueban para PNG, la primera que exista
+EXPORT_FONTS = [
+    "DejaVuSansMono.ttf",
+    "consola.ttf",
+    "Menlo.ttc",
+    "LiberationMono-Regular.ttf",
+]
+# Glifos y trozos de texto distintos que guarda cada proceso, limita la
+# memoria de la caché
+EXPORT_GLYPHS = 512
+# Memoria estimada de cada proceso al exportar PNG, para el límite de --memory
+EXPORT_WORKER_MEMORY = 64 * 1024 * 1024
+
+
+def parse_ansi(text: str) -> list[list[tuple[tuple, str]]]:
+    """
+    Returns the rows of the text as lists of (style, text) runs, where style
+    is (color index or None, intensity: 0 normal, 1 bright, 2 dim). Tabs are
+    expanded like in a terminal.
+    """
+    import re
+
+    rows = []
+    color, intensity = None, 0
+    for line in text.split("\n"):
+        runs, column = [], 0
+        for piece in re.split(r"(\x1b\[[0-9;]*m)", line):
+            if piece.startswith("\x1b["):
+                for code in (piece[2:-1] or "0").split(";"):
+                    code = int(code or 0)
+                    if code == 0:
+                        color, intensity = None, 0
+                    elif code in [1, 2]:
+                        intensity = code
+                    elif code == 22:
+                        intensity = 0
+                    elif 30 <= code <= 37:
+                        color = code - 30
+                    elif code == 39:
+                        color = None
+                continue
+            if "\t" in piece:
+                expanded = ""
+                for char in piece:
+                    if char == "\t":
+                        char = " " * (8 - (column + len(expanded)) % 8)
+                    expanded += char
+                piece = expanded
+            if piece:
+                runs.append(((color, intensity), piece))
+                column += len(piece)
+        rows.append(runs)
+
+    # Las filas vacías del final no se dibujan
+    while rows and not "".join(text for _, text in rows[-1]).strip():
+        rows.pop()
+    return rows
+
+
+@functools.lru_cache(maxsize=None)
+def style_color(style: tuple) -> str:
+    """
+    Returns the "#rrggbb" color of a (color, intensity) style.
+    """
+    color, intensity = style
+    if color is None:
+        value = EXPORT_FOREGROUND
+    else:
+        value = EXPORT_PALETTE[intensity == 1][color]
+    if intensity == 2:
+        # Atenuado: a medio camino del fondo
+        value = "#" + "".join(
+            f"{(int(value[i : i + 2], 16) + int(EXPORT_BACKGROUND[i : i + 2], 16)) // 2:02x}"
+            for i in [1, 3, 5]
+        )
+    return value
+
+
+def style_class(style: tuple) -> str:
+    """
+    Returns the CSS class of a (color, intensity) style, like "x3b".
+    """
+    color, intensity = style
+    return f"x{'f' if color is None else color}{'nbd'[intensity]}"
+
+
+@functools.lru_cache(maxsize=None)
+def export_stylesheet() -> str:
+    """
+    Returns the CSS rules of every style, the same for every banner.
+    """
+    styles = [
+        (color, intensity)
+        for color in [None, *range(len(COLORS))]
+        for intensity in range(3)
+    ]
+    return "\n".join(
+        f".{style_class(style)}{{color:{style_color(style)}}}" for style in styles
+    )
+
+
+def export_html(rows: list) -> str:
+    """
+    Returns the parsed banner as a standalone HTML page.
+    """
+    from html import escape
+
+    lines = [
+        "".join(
+            f'<span class="{style_class(style)}">{escape(text)}</span>'
+            for style, text in runs
+        )
+        for runs in rows
+    ]
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>xq</title>\n'
+        f"<style>\npre{{background:{EXPORT_BACKGROUND};color:{EXPORT_FOREGROUND};"
+        f"font:{EXPORT_FONT_SIZE}px monospace;padding:1em;display:inline-block}}\n"
+        f"{export_stylesheet()}\n</style>\n</head>\n<body>\n"
+        f"<pre>{chr(10).join(lines)}</pre>\n</body>\n</html>\n"
+    )
+
+
+def export_svg(rows: list) -> str:
+    """
+    Returns the parsed banner as an SVG image. Every run is placed on its
+    column, so it lines up with any monospace font.
+    """
+    from html import escape
+
+    width = EXPORT_FONT_SIZE * 0.6
+    height = EXPORT_FONT_SIZE * 1.2
+    columns = max((sum(len(text) for _, text in runs) for runs in rows), default=0)
+    lines = []
+    for row, runs in enumerate(rows):
+        column, spans = 0, []
+        for style, text in runs:
+            if text.strip():
+                spans.append(
+                    f'<tspan x="{column * width:.1f}" fill="{style_color(style)}">'
+                    f"{escape(text)}</tspan>"
+                )
+            column += len(text)
+        if spans:
+            lines.append(f'<text y="{(row + 1) * height:.1f}">{"".join(spans)}</text>')
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{columns * width:.0f}" '
+        f'height="{(len(rows) + 0.5) * height:.0f}" font-family="monospace" '
+        f'font-size="{EXPORT_FONT_SIZE}" xml:space="preserve">\n'
+        f'<rect width="100%" height="100%" fill="{EXPORT_BACKGROUND}"/>\n'
+        + "\n".join(lines)
+        + "\n</svg>\n"
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_export_font():
+    """
+    Returns the Pillow font for PNG and the (width, height) of a cell.
+    """
+    from PIL import ImageFont
+
+    for name in EXPORT_FONTS:
+        try:
+            font = ImageFont.truetype(name, EXPORT_FONT_SIZE)
+            break
+        except OSError:
+            continue
+    else:
+        # No tiene todos los glifos, pero siempre está disponible
+        font = ImageFont.load_default()
+    ascent, descent = font.getmetrics()
+    return font, (round(font.getlength("M")), ascent + descent)
+
+
+@functools.lru_cache(maxsize=EXPORT_GLYPHS)
+def glyph_mask(char: str):
+    """
+    Returns the mask of a character the size of a cell. The color is applied
+    when pasting, so every color shares the same mask.
+    """
+    from PIL import Image, ImageDraw
+
+    font, size = load_export_font()
+    mask = Image.new("L", size, 0)
+    if char == "█":
+        # El bloque ocupa la celda entera, sin huecos entre filas
+        mask.paste(255, (0, 0, *size))
+    else:
+        ImageDraw.Draw(mask).text((0, 0), char, fill=255, font=font)
+    return mask
+
+
+@functools.lru_cache(maxsize=EXPORT_GLYPHS)
+def run_mask(text: str):
+    """
+    Returns the mask of a run of characters, built from their glyph masks.
+    The runs of the art are the same in every banner, so they are built once.
+    """
+    from PIL import Image
+
+    _, (width, height) = load_export_font()
+    mask = Image.new("L", (len(text) * width, height), 0)
+    for column, char in enumerate(text):
+        if not char.isspace():
+            mask.paste(glyph_mask(char), (column * width, 0))
+    return mask
+
+
+def export_png(rows: list) -> bytes:
+    """
+    Returns the parsed banner as a PNG image (needs Pillow).
+    """
+    import io
+
+    from PIL import Image
+
+    _, (width, height) = load_export_font()
+    columns = max((sum(len(text) for _, text in runs) for runs in rows), default=0)
+    padding = width
+    image = Image.new(
+        "RGB",
+        (columns * width + 2 * padding, len(rows) * height + 2 * padding),
+        EXPORT_BACKGROUND,
+    )
+    for row, runs in enumerate(rows):
+        column = 0
+        for style, text in runs:
+            if text.strip():
+                x = padding + column * width
+                y = padding + row * height
+                image.paste(
+                    style_color(style),
+                    (x, y, x + len(text) * width, y + height),
+                    run_mask(text),
+                )
+            column += len(text)
+
+    # Comprimir menos es un tercio más rápido y el archivo ocupa un 10% más
+    output = io.BytesIO()
+    image.save(output, "PNG", compress_level=1)
+    return output.getvalue()
+
+
+def export_banner(snapshot: SystemSnapshot, export_format: str, settings: dict):
+    """
+    Returns the banner of the snapshot as HTML or SVG text, or PNG bytes.
+    """
+    rows = parse_ansi(render(snapshot, settings=settings))
+    if export_format == "html":
+        return export_html(rows)
+    elif export_format == "svg":
+        return export_svg(rows)
+    elif export_format == "png":
+        return export_png(rows)
+
+
+def export_target(values: dict, export_format: str, settings: dict, path: str) -> str:
+    """
+    Exports the snapshot values to the file path and returns the path. Runs
+    in the export processes, so only the values and the path are sent.
+    """
+    content = export_banner(snapshot_from_dict(values), export_format, settings)
+    with open(path, "wb") as file:
+        file.write(content.encode("utf-8") if isinstance(content, str) else content)
+    return path
+
+
+def read_export_input(input_file: str):
+    """
+    Yields (name, values) of every snapshot of the NDJSON file: lines of
+    --format ndjson or reports of --batch (the failed ones are skipped).
+    """
+    import json
+    import re
+
+    file = sys.stdin if input_file == "-" else open(input_file, "r")
+    try:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                values = json.loads(line)
+            except json.decoder.JSONDecodeError as err:
+                print(f"Warning: Skipping line {number}: {err}", file=sys.stderr)
+                continue
+            name = values.get("target")
+            # Los informes de --batch llevan "ok"; los fallidos no tienen valores
+            if "target" in values and "ok" in values:
+                if not values["ok"]:
+                    print(
+                        f"Warning: Skipping line {number}: {name} failed: "
+                        f"{values.get('error')}",
+                        file=sys.stderr,
+                    )
+                    continue
+                values = values["values"]
+            name = re.sub(r"[^\w.-]+", "_", name or values.get("machine") or "xq")
+            yield f"{number:05d}-{name}", values
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def run_export(
+    data: dict,
+    export_format: str,
+    input_file: Optional[str],
+    output: Optional[str],
+    jobs: int,
+    memory: int,
+) -> bool:
+    """
+    Exports the banner of this machine, or of every snapshot of the input
+    file with a pool of processes. The processes and the pending snapshots
+    are limited so the memory stays within memory bytes.
+    """
+    settings = data["settings"]
+    if export_format == "png":
+        import importlib.util
+
+        if importlib.util.find_spec("PIL") is None:
+            print("PNG export needs Pillow: pip install pillow", file=sys.stderr)
+            return False
+
+    if input_file is None:
+        content = export_banner(collect(settings), export_format, settings)
+        if output is None and export_format == "png":
+            output = "xq.png"
+        if output is None:
+            sys.stdout.write(content)
+            return True
+        with open(output, "wb") as file:
+            file.write(content.encode("utf-8") if isinstance(content, str) else content)
+        print(f"Banner saved to {output}.")
+        return True
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    output = output or "."
+    os.makedirs(output, exist_ok=True)
+    workers = max(1, min(jobs, memory // EXPORT_WORKER_MEMORY))
+    start = time.perf_counter()
+    count, failed = 0, 0
+
+    def finished(futures):
+        nonlocal count, failed
+        for future in futures:
+            count += 1
+            if future.exception() is not None:
+                failed += 1
+                print(f"Warning: Export failed: {future.exception()}", file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        # Se leen las líneas según se exportan: como mucho dos por proceso
+        # esperando, aunque la entrada tenga miles
+        for name, values in read_export_input(input_file):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                finished(done)
+            path = os.path.join(output, f"{name}.{export_format}")
+            pending.add(
+                pool.submit(export_target, values, export_format, settings, path)
+            )
+        finished(wait(pending).done)
+
+    total = (time.perf_counter() - start) * 1000
+    print(
+        f"{count - failed} banners exported to {output} in {total:.1f} ms"
+        f" with {workers} processes" + (f", {failed} failed." if failed else "."),
+        file=sys.stderr,
+    )
+    return not failed
+
+
+# Métricas: muestras periódicas guardadas en buffers circulares de tamaño fijo
+
+# Series de cada muestra: uso de CPU y RAM (%) y bytes por segundo de disco y red
+METRICS = ["cpu", "ram", "disk_read", "disk_write", "net_rx", "net_tx"]
+# Contadores que se leen en cada muestra
+METRICS_COLLECTORS = {
+    "ram": COLLECTORS["ram"],
+    "network": COLLECTORS["network"],
+    "cpu_times": Collector("cpu_times", BACKEND["cpu_times"]),
+    "disk_io": Collector("disk_io", BACKEND["disk_io"]),
+}
+
+
+def create_sampler(size: int = METRICS_SIZE) -> dict:
+    """
+    Returns an empty sampler that keeps the last size samples of every metric.
+    """
+    from array import array
+
+    return {
+        "size": size,
+        "count": 0,  # Muestras guardadas desde el principio
+        "last": None,  # Contadores de la muestra anterior
+        "series": {name: array("d", bytes(8 * size)) for name in METRICS},
+        # Uso de cada núcleo, se crean con la primera muestra
+        "cores": [],
+    }
+
+
+def sample_metrics(sampler: dict, results: dict):
+    """
+    Stores the rates since the previous sample, from the counter deltas of the
+    METRICS_COLLECTORS results. The first sample only keeps the counters.
+    """
+    from array import array
+
+    network = results["network"]
+    counters = {
+        "time": time.monotonic(),
+        "cpu": results["cpu_times"],
+        "disk": results["disk_io"],
+        "net": network
+        and (sum(rx for _, _, rx, _ in network), sum(tx for _, _, _, tx in network)),
+    }
+    last, sampler["last"] = sampler["last"], counters
+    if last is None:
+        return
+
+    elapsed = counters["time"] - last["time"]
+    nan = float("nan")  # Valor que no se pudo obtener
+
+    def usage(new, old):
+        busy, total = new[0] - old[0], new[1] - old[1]
+        return busy / total * 100 if total > 0 else 0.0
+
+    def rates(name):
+        if not counters[name] or not last[name]:
+            return nan, nan
+        # Si un contador vuelve a empezar (por ejemplo, un disco nuevo) no es negativo
+        return tuple(
+            max(0, new - old) / elapsed for new, old in zip(counters[name], last[name])
+        )
+
+    cores = []
+    values = dict.fromkeys(METRICS, nan)
+    if counters["cpu"] and last["cpu"]:
+        values["cpu"] = usage(counters["cpu"][0], last["cpu"][0])
+        cores = [
+            usage(new, old) for new, old in zip(counters["cpu"][1:], last["cpu"][1:])
+        ]
+    if results["ram"]:
+        values["ram"] = results["ram"][2]
+    values["disk_read"], values["disk_write"] = rates("disk")
+    values["net_rx"], values["net_tx"] = rates("net")
+
+    size = sampler["size"]
+    index = sampler["count"] % size
+    for name, value in values.items():
+        sampler["series"][name][index] = value
+    # Los núcleos pueden cambiar (CPU hotplug): se empiezan de nuevo
+    if len(sampler["cores"]) != len(cores):
+        sampler["cores"] = [array("d", [nan] * size) for _ in cores]
+    for series, value in zip(sampler["cores"], cores):
+        series[index] = value
+    sampler["count"] += 1
+
+
+def metrics_history(sampler: dict) -> Optional[dict]:
+    """
+    Returns name -> samples (oldest first, None when missing) of every metric
+    and the current usage of every core, or None before the second sample.
+    """
+    count, size = sampler["count"], sampler["size"]
+    if not count:
+        return None
+
+    index = count % size
+
+    def rounded(values):
+        # NaN es el único valor distinto de sí mismo
+        return tuple(None if value != value else round(value, 1) for value in values)
+
+    # Cuando el buffer está lleno la muestra más antigua es la siguiente a escribir
+    history = {
+        name: rounded(
+            series[:count] if count < size else series[index:] + series[:index]
+        )
+        for name, series in sampler["series"].items()
+    }
+    history["cores"] = rounded(
+        series[(count - 1) % size] for series in sampler["cores"]
+    )
+    return history
+
+
+def apply_metrics(snapshot: SystemSnapshot, sampler: dict) -> SystemSnapshot:
+    """
+    Returns the snapshot with the sampled history and the current CPU usage.
+    """
+    metrics = metrics_history(sampler)
+    if metrics is None:
+        return snapshot
+    return snapshot._replace(cpu_percent=metrics["cpu"][-1], metrics=metrics)
+
+
+# Historial de uptime y RAM
+
+
+def history_files() -> list[str]:
+    """
+    Returns the history files that exist, oldest first.
+    """
+    paths = [f"{HISTORY_FILE}.{index}" for index in range(HISTORY_FILES, 0, -1)]
+    return [path for path in paths + [HISTORY_FILE] if os.path.exists(path)]
+
+
+def append_history(snapshot: SystemSnapshot):
+    """
+    Appends the uptime and RAM of the snapshot to the history, unless the last
+    record is less than HISTORY_INTERVAL seconds old.
+    """
+    import struct
+
+    size = struct.calcsize(HISTORY_RECORD)
+    now = time.time()
+    values = [snapshot.uptime, snapshot.ram_used, snapshot.ram_total]
+    record = struct.pack(
+        HISTORY_RECORD,
+        now,
+        *(float("nan") if value is None else value for value in values),
+    )
+
+    try:
+        # El directorio solo se crea la primera vez
+        if not os.path.exists(HISTORY_FILE):
+            os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+        # En modo "a" todas las escrituras van al final, aunque se lea antes
+        with open(HISTORY_FILE, "ab+") as file:
+            end = file.seek(0, os.SEEK_END)
+            # Un registro a medias (por ejemplo, al apagar el equipo) se descarta
+            if end % size:
+                end -= end % size
+                file.truncate(end)
+            if end:
+                file.seek(end - size)
+                last = struct.unpack(HISTORY_RECORD, file.read(size))[0]
+                if now - last < HISTORY_INTERVAL:
+                    return
+            file.write(record)
+    except OSError as err:
+        print(f"Warning: Error saving the history: {err}", file=sys.stderr)
+        return
+
+    if end + size > HISTORY_MAX_BYTES:
+        rotate_history()
+
+
+def rotate_history():
+    """
+    Renames the history to history.bin.1 (and .1 to .2, ...) and deletes the
+    files beyond HISTORY_FILES or older than HISTORY_RETENTION.
+    """
+    with locked(HISTORY_FILE):
+        # Otro proceso pudo rotarlo mientras se esperaba el bloqueo
+        if (
+            not os.path.exists(HISTORY_FILE)
+            or os.path.getsize(HISTORY_FILE) <= HISTORY_MAX_BYTES
+        ):
+            return
+
+        # El último se sobrescribe con el anterior
+        for index in range(HISTORY_FILES, 0, -1):
+            source = f"{HISTORY_FILE}.{index - 1}" if index > 1 else HISTORY_FILE
+            if os.path.exists(source):
+                os.replace(source, f"{HISTORY_FILE}.{index}")
+
+        # La fecha de modificación es la del último registro de cada archivo
+        for path in history_files():
+            if time.time() - os.path.getmtime(path) > HISTORY_RETENTION:
+                os.remove(path)
+
+
+def read_history(since: float, until: float):
+    """
+    Yields the (time, uptime, ram used, ram total) records between since and
+    until. The first one is found by binary search over the memory-mapped
+    files, so only the records asked for are read.
+    """
+    import mmap
+    import struct
+
+    record = struct.Struct(HISTORY_RECORD)
+    for path in history_files():
+        with open(path, "rb") as file:
+            count = os.fstat(file.fileno()).st_size // record.size
+            if not count:
+                continue
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                # Los registros están ordenados por hora
+                if record.unpack_from(data, (count - 1) * record.size)[0] < since:
+                    continue
+                low, high = 0, count
+                while low < high:
+                    middle = (low + high) // 2
+                    if record.unpack_from(data, middle * record.size)[0] < since:
+                        low = middle + 1
+                    else:
+                        high = middle
+
+                for index in range(low, count):
+                    values = record.unpack_from(data, index * record.size)
+                    if values[0] > until:
+                        return
+                    yield values
+
+
+def parse_time(text: str) -> float:
+    """
+    Returns the timestamp of a time ago (90s, 30m, 12h, 7d, 2w) or of an ISO
+    8601 date.
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 24 * 3600, "w": 7 * 24 * 3600}
+    number = text[:-1]
+    if text[-1:] in units and number.replace(".", "", 1).isdigit():
+        return time.time() - float(number) * units[text[-1]]
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+def run_history(since: float, until: float, field: str, settings: dict):
+    """
+    Prints the saved values of the field (ram or uptime) between since and
+    until, one line per record.
+    """
+    lines = []
+    for timestamp, uptime, used, total in read_history(since, until):
+        # NaN (el único valor distinto de sí mismo) es un valor que faltó
+        if field == "ram":
+            value = PLACEHOLDER
+            if used == used and total == total:
+                value = format_ram(
+                    int(used), int(total), round(used / total * 100, 1), settings
+                )
+        else:
+            value = format_uptime(uptime if uptime == uptime else None)
+        when = datetime.datetime.fromtimestamp(timestamp)
+        lines.append(f"{when:%Y-%m-%d %H:%M:%S}  {value}")
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+    else:
+        print("No history in that range.")
+
+
+# Modo watch
+
+# Recolectores de los valores que cambian, los únicos que se vuelven a leer
+WATCH_COLLECTORS = {
+    **{name: COLLECTORS[name] for name in ["uptime", "date"]},
+    **METRICS_COLLECTORS,
+}
+
+
+def run_watch(data: dict, interval: float):
+    """
+    Prints the info once and then redraws only the fields that changed.
+    """
+    settings = data["settings"]
+    sampler = create_sampler()
+    # La primera muestra solo inicia la medida
+    snapshot = collect_snapshot(data, sampler=sampler)
+    banner = fetch_info(snapshot, settings)
+    fields = fetch_data(snapshot, settings)
+    # Fila, columna y etiqueta de cada campo, calculadas al compilar el dibujo
+    positions = field_positions(settings["color"], get_fields(settings))
+    last_row = banner.count("\n") + 1
+
+    # Se limpia la pantalla y se oculta el cursor
+    sys.stdout.write("\x1b[2J\x1b[H\x1b[?25l" + banner)
+    sys.stdout.flush()
+
+    ticks = 0
+    sample_time = 0.0
+    draw_time = 0.0
+    try:
+        while True:
+            time.sleep(interval)
+            start = time.perf_counter()
+
+            results = run_collectors(WATCH_COLLECTORS)
+            sample_metrics(sampler, results)
+            ram = results["ram"] or (None,) * 5
+            snapshot = snapshot._replace(
+                uptime=results["uptime"],
+                ram_used=ram[0],
+                ram_total=ram[1],
+                ram_percent=ram[2],
+                swap_used=ram[3],
+                swap_total=ram[4],
+                network=results["network"],
+                date=results["date"],
+            )
+            snapshot = apply_metrics(snapshot, sampler)
+            append_history(snapshot)
+            new_fields = fetch_data(snapshot, settings)
+            sampled = time.perf_counter()
+
+            # Solo se escriben los campos que cambiaron, cada uno en su posición
+            output = [
+                f"\x1b[{row};{column}H{label}{new_fields[name]}\x1b[K"
+                for name, (row, column, label) in positions.items()
+                if new_fields[name] != fields[name]
+            ]
+            if output:
+                sys.stdout.write("".join(output) + f"\x1b[{last_row};1H")
+                sys.stdout.flush()
+            fields = new_fields
+
+            ticks += 1
+            sample_time += sampled - start
+            draw_time += time.perf_counter() - sampled
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.write(f"\x1b[{last_row};1H\x1b[?25h\n")
+
+    if ticks:
+        print(
+            f"{ticks} updates, average {sample_time / ticks * 1000:.2f} ms sampling"
+            f" + {draw_time / ticks * 1000:.2f} ms drawing."
+        )
+
+
+# Modo daemon
+
+
+def get_socket_file() -> str:
+    """
+    Returns the path of the daemon socket for the current user, inside a
+    directory that only the user can open.
+    """
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"xq-{os.getuid()}", "daemon.sock")
+
+
+def is_private(path: str, kind) -> bool:
+    """
+    Returns True if path is of the kind (stat.S_ISSOCK, stat.S_ISDIR...), is
+    not a symlink and belongs to the current user. Directories must also be
+    closed to the other users.
+    """
+    import stat
+
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if not kind(info.st_mode) or info.st_uid != os.getuid():
+        return False
+    return not (stat.S_ISDIR(info.st_mode) and info.st_mode & 0o077)
+
+
+def read_daemon_banner():
+    """
+    Returns the banner served by the daemon, or None when there is no daemon
+    or it is dead or stale.
+    """
+    if not hasattr(os, "getuid"):
+        return None
+
+    import socket
+    import stat
+
+    # En /tmp otro usuario podría crear el socket antes y enviar cualquier
+    # texto (incluidas secuencias de escape) a las terminales
+    socket_file = get_socket_file()
+    if not is_private(os.path.dirname(socket_file), stat.S_ISDIR) or not is_private(
+        socket_file, stat.S_ISSOCK
+    ):
+        return None
+
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(0.1)
+            client.connect(socket_file)
+            while chunk := client.recv(65536):
+                chunks.append(chunk)
+    except ConnectionRefusedError:
+        # El daemon murió sin borrar el socket
+        try:
+            os.remove(socket_file)
+        except OSError:
+            pass
+        return None
+    except OSError:
+        return None
+
+    header, _, banner = b"".join(chunks).partition(b"\n")
+    try:
+        if time.time() - float(header) > DAEMON_STALE:
+            return None
+    except ValueError:
+        return None
+
+    shell = BACKEND["shell"]() or PLACEHOLDER
+    return banner.decode("utf-8").replace(DAEMON_SHELL, shell)
+
+
+def run_daemon():
+    """
+    Keeps the banner rendered and serves it over a Unix domain socket.
+    """
+    import signal
+    import socket
+    import stat
+    import threading
+
+    socket_file = get_socket_file()
+    if read_daemon_banner() is not None:
+        print(f"A daemon is already running on {socket_file}.")
+        return
+
+    # El socket va en un directorio que solo puede abrir el usuario
+    socket_dir = os.path.dirname(socket_file)
+    try:
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    except OSError as err:
+        print(f"Error creating {socket_dir}: {err}", file=sys.stderr)
+        return
+    if not is_private(socket_dir, stat.S_ISDIR):
+        print(
+            f"Error: {socket_dir} must be a directory of the current user"
+            " with permissions 0700.",
+            file=sys.stderr,
+        )
+        return
+
+    state = {}
+
+    def refresh():
+        sampler = create_sampler()
+        while True:
+            try:
+                # Los ajustes se vuelven a leer para aplicar los cambios de color, etc.
+                data = load_data()
+                snapshot = collect_snapshot(data, sampler=sampler)
+                append_history(snapshot)
+                # Los valores de cada cliente no se sirven (el shell y la
+                # terminal del daemon no son los de quien lo consulta)
+                snapshot = snapshot._replace(shell=DAEMON_SHELL, terminal=None)
+                banner = fetch_info(snapshot, data["settings"]) + "\n"
+                state["payload"] = f"{time.time()}\n{banner}".encode("utf-8")
+            except Exception as err:
+                # Se sigue intentando: mientras tanto el banner se queda viejo
+                # y las ejecuciones lo obtienen por su cuenta
+                print(f"Warning: Error refreshing the banner: {err}", file=sys.stderr)
+            time.sleep(DAEMON_INTERVAL)
+
+    # Con SIGTERM también se borra el socket al salir
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    # Si quedó un socket de un daemon anterior se reemplaza
+    try:
+        if os.path.lexists(socket_file):
+            os.remove(socket_file)
+    except OSError as err:
+        print(f"Error removing the old socket {socket_file}: {err}", file=sys.stderr)
+        return
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(socket_file)
+        os.chmod(socket_file, 0o600)
+        server.listen()
+        threading.Thread(target=refresh, daemon=True).start()
+        print(f"Serving on {socket_file}.")
+
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    if "payload" in state:
+                        connection.sendall(state["payload"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_file)
+
+
+# Exportador de métricas en formato OpenMetrics (Prometheus)
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def format_openmetrics(snapshot: SystemSnapshot, elapsed: float) -> str:
+    """
+    Returns the numeric values of the snapshot in OpenMetrics text format.
+    elapsed is how long the collection took, in seconds.
+    """
+    lines = []
+
+    def label(value) -> str:
+        text = str(value).replace("\\", "\\\\")
+        return text.replace('"', '\\"').replace("\n", "\\n")
+
+    def family(name, kind, description, samples, unit=""):
+        # samples: [(etiquetas, valor), ...]. Sin valores no se escribe nada
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        lines.append(f"# TYPE {name} {kind}")
+        if unit:
+            lines.append(f"# UNIT {name} {unit}")
+        lines.append(f"# HELP {name} {description}")
+        suffix = {"counter": "_total", "info": "_info"}.get(kind, "")
+        for labels, value in samples:
+            text = ",".join(f'{key}="{label(item)}"' for key, item in labels.items())
+            lines.append(
+                f"{name}{suffix}{{{text}}} {value}"
+                if text
+                else f"{name}{suffix} {value}"
+            )
+
+    info = {
+        key: value
+        for key, value in [
+            ("machine", snapshot.machine),
+            ("user", snapshot.user),
+            ("os", snapshot.os),
+            ("cpu", snapshot.cpu),
+            ("gpu", snapshot.gpu),
+            ("version", snapshot.version),
+        ]
+        if value is not None
+    }
+    family("xq", "info", "Machine and xq information.", [(info, 1)])
+    family(
+        "xq_uptime_seconds",
+        "gauge",
+        "Time since the machine or container started.",
+        [({}, snapshot.uptime)],
+        "seconds",
+    )
+    family(
+        "xq_memory_used_bytes",
+        "gauge",
+        "Used RAM.",
+        [({}, snapshot.ram_used)],
+        "bytes",
+    )
+    family(
+        "xq_memory_total_bytes",
+        "gauge",
+        "Total RAM, or the memory limit of the container.",
+        [({}, snapshot.ram_total)],
+        "bytes",
+    )
+    family(
+        "xq_swap_used_bytes", "gauge", "Used swap.", [({}, snapshot.swap_used)], "bytes"
+    )
+    family(
+        "xq_swap_total_bytes",
+        "gauge",
+        "Total swap.",
+        [({}, snapshot.swap_total)],
+        "bytes",
+    )
+    family(
+        "xq_cpu_usage_percent",
+        "gauge",
+        "CPU usage since the previous refresh.",
+        [({}, snapshot.cpu_percent)],
+        "percent",
+    )
+    family(
+        "xq_cpu_limit",
+        "gauge",
+        "CPUs the container may use (cgroup cpu.max).",
+        [({}, snapshot.cpu_limit)],
+    )
+    family(
+        "xq_load_average",
+        "gauge",
+        "Load average.",
+        [
+            ({"period": period}, value)
+            for period, value in zip(["1m", "5m", "15m"], snapshot.load_average or ())
+        ],
+    )
+    family(
+        "xq_disk_used_bytes",
+        "gauge",
+        "Used space of every disk.",
+        [({"mount": mount}, used) for mount, used, _ in snapshot.disks or ()],
+        "bytes",
+    )
+    family(
+        "xq_disk_total_bytes",
+        "gauge",
+        "Total space of every disk.",
+        [({"mount": mount}, total) for mount, _, total in snapshot.disks or ()],
+        "bytes",
+    )
+    family(
+        "xq_network_receive_bytes",
+        "counter",
+        "Bytes received by every network interface.",
+        [({"interface": name}, rx) for name, _, rx, _ in snapshot.network or ()],
+        "bytes",
+    )
+    family(
+        "xq_network_transmit_bytes",
+        "counter",
+        "Bytes sent by every network interface.",
+        [({"interface": name}, tx) for name, _, _, tx in snapshot.network or ()],
+        "bytes",
+    )
+    family(
+        "xq_packages",
+        "gauge",
+        "Installed packages of every package manager.",
+        [({"manager": manager}, count) for manager, count in snapshot.packages or ()],
+    )
+    family(
+        "xq_collect_duration_seconds",
+        "gauge",
+        "How long the last refresh of the values took.",
+        [({}, round(elapsed, 6))],
+        "seconds",
+    )
+    family(
+        "xq_collect_timestamp_seconds",
+        "gauge",
+        "When the values were collected (Unix time).",
+        [({}, round(time.time(), 3))],
+        "seconds",
+    )
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def run_serve_metrics(address: str, interval: float):
+    """
+    Serves the values over HTTP in OpenMetrics format at /metrics. A thread
+    refreshes them every interval seconds, the requests only send the last
+    payload and never wait for the collectors.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    host, _, port = address.rpartition(":")
+    sampler = create_sampler()
+
+    def refresh() -> bytes:
+        start = time.perf_counter()
+        # Los ajustes se vuelven a leer, como en el daemon
+        data = load_data()
+        snapshot = collect_snapshot(data, everything=True, sampler=sampler)
+        append_history(snapshot)
+        text = format_openmetrics(snapshot, time.perf_counter() - start)
+        return text.encode("utf-8")
+
+    # La primera vez se obtiene antes de escuchar: nunca se sirve vacío
+    state = {"payload": refresh()}
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                state["payload"] = refresh()
+            except Exception as err:
+                # Se sigue sirviendo el último valor
+                print(f"Warning: Error refreshing the metrics: {err}", file=sys.stderr)
+
+    class Handler(BaseHTTPRequestHandler):
+        # Mantiene la conexión abierta entre peticiones del mismo cliente
+        protocol_version = "HTTP/1.1"
+        # Las cabeceras y el contenido se envían por separado: con Nagle cada
+        # petición en una conexión abierta esperaría unos 40 ms al ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path.partition("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = state["payload"]
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Sin una línea por petición
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), Handler)
+    except (OSError, ValueError) as err:
+        print(f"Error listening on {address}: {err}", file=sys.stderr)
+        return False
+    server.daemon_threads = True
+    threading.Thread(target=loop, daemon=True).start()
+    host, port = server.server_address[:2]
+    print(f"Serving metrics on http://{host}:{port}/metrics.", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return True
+
+
+# Medición de tiempos
+
+
+def traced(name: str, function):
+    """
+    Returns the function wrapped to record its time and the files it opens.
+    """
+    import threading
+
+    def wrapper(*args, **kwargs):
+        # Solo los archivos que abre este hilo: los recolectores se ejecutan a
+        # la vez en otros
+        counter = TRACE["thread"]
+        opens = getattr(counter, "opens", 0)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            TRACE["spans"].append(
+                {
+                    "name": name,
+                    "start": start,
+                    "end": end,
+                    "opens": getattr(counter, "opens", 0) - opens,
+                    "thread": threading.get_ident(),
+                }
+            )
+
+    return wrapper
+
+
+def enable_trace():
+    """
+    Wraps the pipeline functions and the collectors with timers. Nothing is
+    wrapped while tracing is off, so it costs nothing then.
+    """
+    import threading
+
+    global TRACE
+
+    # "opens" es el total del proceso y "thread" lleva la cuenta de cada hilo
+    TRACE = {"spans": [], "opens": 0, "thread": threading.local()}
+
+    def count_opens(event, args):
+        if event == "open":
+            TRACE["opens"] += 1
+            counter = TRACE["thread"]
+            counter.opens = getattr(counter, "opens", 0) + 1
+
+    sys.addaudithook(count_opens)
+    TRACE["spans"].append(
+        {
+            "name": "module",
+            "start": START_TIME,
+            "end": time.perf_counter(),
+            "opens": 0,
+            "thread": None,
+        }
+    )
+
+    # Las funciones se llaman entre ellas por su nombre global, así que basta
+    # con reemplazarlas en el módulo
+    module = globals()
+    for name in TRACED_FUNCTIONS:
+        module[name] = traced(name, module[name])
+    # La CPU y la GPU solo se consultan al crear la caché de hardware
+    for name in ["cpu", "gpu"]:
+        if name in BACKEND:
+            BACKEND[name] = traced(f"facts.{name}", BACKEND[name])
+    # Con métricas (--watch, --daemon, serve) ram y network se obtienen con
+    # los de METRICS_COLLECTORS
+    for collectors in [COLLECTORS, METRICS_COLLECTORS, WATCH_COLLECTORS]:
+        for name, collector in collectors.items():
+            collectors[name] = collector._replace(
+                function=traced(f"collector.{name}", collector.function)
+            )
+
+
+def report_trace(trace_format: str):
+    """
+    Prints the time breakdown (text or json) to stderr or writes a Chrome
+    trace file ("chrome" or "chrome:<path>").
+    """
+    import json
+
+    import threading
+
+    spans = sorted(TRACE["spans"], key=lambda span: span["start"])
+    total = (time.perf_counter() - START_TIME) * 1000
+    main_thread = threading.main_thread().ident
+
+    if trace_format.startswith("chrome"):
+        path = trace_format.partition(":")[2] or TRACE_FILE
+        events = [
+            {
+                "name": span["name"],
+                "ph": "X",
+                "ts": (span["start"] - START_TIME) * 1e6,
+                "dur": (span["end"] - span["start"]) * 1e6,
+                "pid": os.getpid(),
+                "tid": span["thread"] or main_thread,
+                "args": {"opens": span["opens"]},
+            }
+            for span in spans
+        ]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events}, file)
+        print(f"Trace written to {path}.", file=sys.stderr)
+
+    elif trace_format == "json":
+        stages = [
+            {
+                "name": span["name"],
+                "start_ms": round((span["start"] - START_TIME) * 1000, 3),
+                "ms": round((span["end"] - span["start"]) * 1000, 3),
+                "opens": span["opens"],
+            }
+            for span in spans
+        ]
+        report = {"total_ms": round(total, 3), "opens": TRACE["opens"]}
+        print(json.dumps({**report, "stages": stages}), file=sys.stderr)
+
+    else:
+        for span in spans:
+            ms = (span["end"] - span["start"]) * 1000
+            start = (span["start"] - START_TIME) * 1000
+            print(
+                f"{span['name']:<20} {ms:9.3f} ms  (at {start:8.3f} ms,"
+                f" {span['opens']} opens)",
+                file=sys.stderr,
+            )
+        print(
+            f"{'total':<20} {total:9.3f} ms  ({TRACE['opens']} opens)", file=sys.stderr
+        )
+
+
+# Uso como librería: import xq; print(xq.render(xq.collect()))
+
+
+def collect(settings: Optional[dict] = None, everything: bool = True) -> SystemSnapshot:
+    """
+    Collects the system info and returns it as a SystemSnapshot. Without
+    settings the saved ones are used; with everything False only the values of
+    the enabled fields are collected.
+    """
+    if settings is None:
+        data = load_data()
+    else:
+        data = validate_data({"settings": settings})
+    return collect_snapshot(data, everything)
+
+
+def render(
+    snapshot: SystemSnapshot,
+    theme: Optional[str] = None,
+    settings: Optional[dict] = None,
+) -> str:
+    """
+    Returns the banner of the snapshot. theme is one of COLORS and overrides
+    the color of the settings (the saved ones if not given).
+    """
+    if settings is None:
+        settings = load_data()["settings"]
+    else:
+        settings = validate_data({"settings": settings})["settings"]
+    if theme is not None:
+        if theme.lower() not in COLORS:
+            raise ValueError(f"Unknown theme '{theme}', use one of {COLORS}")
+        settings = {**settings, "color": theme.lower()}
+    return fetch_info(snapshot, settings)
+
+
+# Configuración del analizador de argumentos de línea de comandos
+
+
+def positive_int(text: str) -> int:
+    """
+    Returns the integer of a command line argument that must be above 0.
+    """
+    import argparse
+
+    value = int(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {text}")
+    return value
+
+
+def positive_float(text: str) -> float:
+    """
+    Returns the number of a command line argument that must be above 0 (and
+    finite, it is a time to sleep).
+    """
+    import argparse
+
+    value = float(text)
+    if not 0 < value < float("inf"):
+        raise argparse.ArgumentTypeError(f"must be a finite number above 0: {text}")
+    return value
+
+
+def build_parser():
+    """
+    Returns the command line parser.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch on Windows")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    history = commands.add_parser(
+        "history", help="Show how the RAM or uptime changed over time"
+    )
+    history.add_argument(
+        "--since",
+        metavar="time",
+        help="Start of the range: 90s, 30m, 12h, 7d, 2w ago or an ISO date (default 1d)",
+        default="1d",
+        type=parse_time,
+    )
+    history.add_argument(
+        "--until",
+        metavar="time",
+        help="End of the range, like --since (default now)",
+        default=float("inf"),
+        type=parse_time,
+    )
+    history.add_argument(
+        "--field",
+        metavar="field",
+        help="Value to show: ram (default) or uptime",
+        choices=HISTORY_FIELDS,
+        default="ram",
+    )
+
+    config = commands.add_parser(
+        "config", help="Show or change the settings without prompts"
+    )
+    actions = config.add_subparsers(dest="action", metavar="action", required=True)
+    actions.add_parser("show", help="Print the settings as JSON").set_defaults(
+        values=[]
+    )
+    actions.add_parser(
+        "set", help="Change many settings at once, or none if any is invalid"
+    ).add_argument(
+        "values",
+        metavar="key=value",
+        help=f"Setting to change: {', '.join(SETTING_KEYS)}",
+        nargs="+",
+    )
+    actions.add_parser(
+        "import", help="Replace the settings with a JSON document"
+    ).add_argument(
+        "values",
+        metavar="file",
+        help="JSON file like settings.json (- for stdin)",
+        nargs=1,
+    )
+
+    serve = commands.add_parser(
+        "serve", help="Serve the values over HTTP for Prometheus"
+    )
+    serve.add_argument(
+        "--metrics",
+        help="Serve the values in OpenMetrics format at /metrics",
+        action="store_true",
+    )
+    serve.add_argument(
+        "--listen",
+        metavar="host:port",
+        help=f"Address to listen on (default {SERVE_ADDRESS}, port 0 picks a free one)",
+        default=SERVE_ADDRESS,
+    )
+    serve.add_argument(
+        "--interval",
+        metavar="seconds",
+        help=f"Seconds between refreshes of the values (default {SERVE_INTERVAL:g})",
+        default=SERVE_INTERVAL,
+        type=positive_float,
+    )
+
+    export = commands.add_parser(
+        "export", help="Save the banner as HTML, SVG or PNG (PNG needs Pillow)"
+    )
+    export.add_argument("export_format", metavar="format", choices=EXPORT_FORMATS)
+    export.add_argument(
+        "-i",
+        "--input",
+        metavar="file",
+        help="NDJSON of --format ndjson or --batch to export (- for stdin), instead of this machine",
+    )
+    export.add_argument(
+        "-o",
+        "--output",
+        metavar="path",
+        help="Output file (default stdout, xq.png for PNG), or directory with --input (default .)",
+    )
+    export.add_argument(
+        "-j",
+        "--jobs",
+        dest="export_jobs",
+        metavar="jobs",
+        help="Number of export processes with --input (default the number of CPUs)",
+        default=os.cpu_count() or 1,
+        type=positive_int,
+    )
+    export.add_argument(
+        "--memory",
+        metavar="MB",
+        help="Memory budget of the export processes in MB (default 512)",
+        default=512,
+        type=positive_int,
+    )
+
+    parser.add_argument("-d", "--delete", help="Delete the data", action="store_true")
+    parser.add_argument(
+        "-c",
+        "--color",
+        metavar="color",
+        help="Change the color",
+        type=str,
+    )
+    parser.add_argument(
+        "-s",
+        "--settings",
+        metavar="setting",
+        help="Change the settings",
+        choices=["ram", "date", "fields", "cache"],
+        nargs="?",
+        type=str,
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        metavar="format",
+        help="Print the raw values as json, ndjson or env instead of the art",
+        choices=OUTPUT_FORMATS,
+        type=str,
+    )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        metavar="file",
+        help="Collect the targets of the file (local, proc:<pid>, cmd:<command>; - for stdin) as NDJSON",
+        type=str,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        metavar="jobs",
+        help=f"Number of targets collected at the same time in batch mode (default {BATCH_JOBS})",
+        default=BATCH_JOBS,
+        type=positive_int,
+    )
+    parser.add_argument(
+        "-w",
+        "--watch",
+        metavar="interval",
+        help="Keep updating the info every interval seconds",
+        type=positive_float,
+    )
+    parser.add_argument(
+        "--timings",
+        metavar="format",
+        help="Print how long every stage took: text (default), json or chrome",
+        choices=TRACE_FORMATS,
+        nargs="?",
+        const="text",
+        type=str,
+    )
+    parser.add_argument(
+        "--update-facts",
+        help=f"Save the hardware facts for every user to {SHARED_FACTS_FILE} (as root, once per boot)",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--daemon",
+        help="Keep running and serve the info to other runs (Linux/macOS)",
+        action="store_true",
+    )
+
+    return parser
+
+
+def main():
+    """
+    Runs the command line interface.
+    """
+    # Sin argumentos no se construye el analizador de argumentos
+    args = build_parser().parse_args() if len(sys.argv) > 1 else None
+    trace_format = os.getenv("XQ_TRACE") or (args and args.timings)
+    if not trace_format:
+        run_cli(args)
+        return
+
+    enable_trace()
+    try:
+        run_cli(args)
+    finally:
+        report_trace("text" if trace_format == "1" else trace_format)
+
+
+def run_cli(args):
+    """
+    Runs what the arguments ask for (args is None when there are none).
+    """
+    # Sin argumentos se muestra la información directamente. Si hay un daemon
+    # se usa su información.
+    if args is None:
+        banner = read_daemon_banner()
+        if banner is not None:
+            sys.stdout.write(banner)
+            return
+
+        settings = load_data()["settings"]
+        snapshot = collect(settings, everything=False)
+        append_history(snapshot)
+        sys.stdout.write(render(snapshot, settings=settings) + "\n")
+        return
+
+    data = load_data()
+
+    if args.update_facts:
+        if not update_shared_facts():
+            sys.exit(1)
+        return
+
+    if args.command == "config":
+        if not run_config(args.action, args.values, data):
+            sys.exit(1)
+        return
+
+    if args.command == "serve":
+        if not args.metrics:
+            print("Nothing to serve, use 'serve --metrics'.", file=sys.stderr)
+            sys.exit(1)
+        if not run_serve_metrics(args.listen, args.interval):
+            sys.exit(1)
+        return
+
+    if args.command == "export":
+        if not run_export(
+            data,
+            args.export_format,
+            args.input,
+            args.output,
+            args.export_jobs,
+            args.memory * 1024 * 1024,
+        ):
+            sys.exit(1)
+        return
+
+    if args.command == "history":
+        run_history(args.since, args.until, args.field, data["settings"])
+        return
+
+    if args.batch:
+        run_batch(data, args.batch, args.jobs)
+        return
+
+    if args.format:
+        snapshot = collect(data["settings"])
+        append_history(snapshot)
+        print(format_snapshot(snapshot, args.format))
+        return
+
+    if args.watch:
+        run_watch(data, args.watch)
+        return
+
+    if args.daemon:
+        if hasattr(os, "getuid"):
+            run_daemon()
+        else:
+            print(
+                "Daemon mode needs Unix domain sockets (Linux/macOS).", file=sys.stderr
+            )
+        return
+
+    # Ejecutando funciones basadas en los argumentos proporcionados
+
+    if args.delete:
+        delete_data()
+
+    if args.color:
+        change_color(args.color)
+
+    if args.settings:
+        if args.settings == "date":
+            format_hour = input("Enter the format for hour (12/24): ").strip()
+            format_date = input("Enter the format for date (full/short): ").strip()
+            change_settings(args.settings, f"{format_hour} {format_date}")
+        elif args.settings == "fields":
+            change_settings(
+                args.settings,
+                input("Enter the fields, separated by commas: ").strip().lower(),
+            )
+        elif args.settings == "cache":
+            change_settings(
+                args.settings,
+                input("Enter the collector, ttl in seconds and policy: ").strip(),
+            )
+        else:
+            change_settings(args.settings, input("Enter the value: ").strip().lower())
+
+    # Imprimiendo información del sistema
+
+    if not (args.delete or args.color or args.settings):
+        snapshot = collect(data["settings"], everything=False)
+        append_history(snapshot)
+        sys.stdout.write(render(snapshot, settings=data["settings"]) + "\n")
+
+
+if __name__ == "__main__":
+    main()